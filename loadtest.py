@@ -0,0 +1,354 @@
+"""Headless load test for the pump selector.
+
+Runs N simulated sessions of selector.py in this process with Streamlit's
+AppTest, each following a realistic script (pick a category, enter a duty
+point, search, tick pumps, change units), against a fake in-memory Supabase
+so nothing leaves the machine. Reports rerun latency, session memory and
+the hit rates of the app's shared caches. A warm-up session runs first, so
+one-time costs (imports, the first catalog load) are reported on their own
+rather than spread over the measured sessions. The catalog TTL is short by
+default, so sessions also run into the background refresh and its
+change probe.
+
+    python loadtest.py --sessions 20 --pumps 5000
+    python loadtest.py --sessions 20 --max-p95-ms 800   # exit 1 if slower
+"""
+import argparse
+import json
+import os
+import pickle
+import random
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+APP_PATH = Path(__file__).with_name("selector.py")
+CATEGORIES = ["Dirty Water", "Clean Water", "Speciality Pump", "Grinder", "Construction",
+              "Sewage and Wastewater", "High Pressure", "Booster", "BLDC"]
+CURVE_HEADS = [5, 10, 15, 20, 25, 30, 35, 40, 50, 60, 70, 80]
+
+
+def make_tables(n_pumps, seed=0):
+    """Synthetic pump and curve tables shaped like the Supabase ones"""
+    rnd = random.Random(seed)
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    pumps, curves = [], []
+    for i in range(n_pumps):
+        model = f"LT{i:06d}"
+        updated_at = (created + timedelta(minutes=rnd.randrange(500_000))).isoformat()
+        q_rated = rnd.choice([60, 120, 250, 500, 1000, 2000]) * rnd.uniform(0.8, 1.25)
+        h_rated = rnd.choice([6, 10, 16, 25, 40]) * rnd.uniform(0.8, 1.25)
+        pumps.append({
+            "DB ID": i, "Model": model, "Model No.": model,
+            "Frequency (Hz)": rnd.choice([50, 60]), "Phase": rnd.choice([1, 3]),
+            "Category": rnd.choice(CATEGORIES),
+            "Q Rated/LPM": round(q_rated), "Head Rated/M": round(h_rated, 1),
+            "Pass Solid Dia(mm)": rnd.choice([0, 6, 10, 35, 50]),
+            "Product Link": "https://www.hungpump.com/", "updated_at": updated_at,
+        })
+        max_flow, max_head = q_rated * 1.6, h_rated * 1.5
+        curve = {"Model No.": model, "updated_at": updated_at}
+        for head in CURVE_HEADS:
+            curve[f"{head}M"] = round(max_flow * (1 - (head / max_head) ** 2), 1) if head < max_head else None
+        curves.append(curve)
+    return {"pump_selection_data": pumps, "pump_curve_data": curves}
+
+
+class FakeQuery:
+    """One PostgREST query: select, order, limit or range, then execute"""
+    def __init__(self, client, rows):
+        self._client = client
+        self._rows = rows
+        self._range = (0, len(rows) - 1)
+        self._count = None
+
+    def select(self, *columns, count=None):
+        self._count = count
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None):
+        """Sort as Postgres does, with NULLs first when descending unless told otherwise"""
+        if any(column not in row for row in self._rows):
+            raise KeyError(f"column {column} does not exist")
+        if nullsfirst is None:
+            nullsfirst = desc
+        nulls = [row for row in self._rows if row[column] is None]
+        values = sorted((row for row in self._rows if row[column] is not None), key=lambda row: row[column], reverse=desc)
+        self._rows = nulls + values if nullsfirst else values + nulls
+        return self
+
+    def limit(self, count):
+        self._range = (self._range[0], self._range[0] + count - 1)
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def execute(self):
+        start, end = self._range
+        with self._client.lock:
+            self._client.requests += 1
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        count = len(self._rows) if self._count == "exact" else None
+        return types.SimpleNamespace(data=self._rows[start:end + 1], count=count)
+
+
+class FakeSupabase:
+    """Just enough of the Supabase client for the paginated table reads and the change probe"""
+    def __init__(self, tables, latency=0.0):
+        self.tables = tables
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        return FakeQuery(self, self.tables[name])
+
+
+def install_fake_supabase(client):
+    """Make `from supabase import create_client` in the app return the fake client"""
+    module = types.ModuleType("supabase")
+    module.create_client = lambda url, key: client
+    sys.modules["supabase"] = module
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_KEY", "loadtest")
+
+
+def share_script_bytecode():
+    """Compile selector.py once for all sessions, as the real server does.
+
+    AppTest builds a fresh ScriptCache on every run, so concurrent sessions
+    would recompile the script in parallel, which is slow and trips a
+    CPython 3.11 parser race.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    compile_lock = threading.Lock()
+    compiled = {}
+    get_bytecode = ScriptCache.get_bytecode
+
+    def shared_get_bytecode(self, script_path):
+        with compile_lock:
+            if script_path not in compiled:
+                compiled[script_path] = get_bytecode(self, script_path)
+            return compiled[script_path]
+    ScriptCache.get_bytecode = shared_get_bytecode
+
+
+def keep_runtime_between_runs():
+    """Stop finished runs from pulling test mode out from under running ones.
+
+    AppTest installs a mock Runtime singleton and turns on the
+    global.appTest option for every run, and undoes both when the run ends.
+    With sessions running side by side, another session's run could find no
+    runtime, or lose test mode halfway through. Test mode is switched on for
+    good and the last runtime installed keeps serving instead.
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    config.set_option("global.appTest", True)
+    last = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+        if "runtime" not in last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last["runtime"]
+
+    def exists(cls):
+        return cls._instance is not None or "runtime" in last
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+def find_button(at, label):
+    return next(button for button in at.button if label in str(button.label))
+
+
+def session_script(at, rnd):
+    """The steps of one simulated visit, each ending in a rerun"""
+    yield "load", lambda: at.run()
+
+    def pick_category():
+        select = at.selectbox(key="category_select")
+        select.set_value(rnd.choice(select.options))
+        at.run()
+    yield "category", pick_category
+
+    def enter_duty_point():
+        at.number_input(key="flow_value").set_value(float(rnd.choice([50, 100, 200, 400, 800])))
+        at.number_input(key="head_value").set_value(float(rnd.choice([5, 8, 12, 20, 30])))
+        at.run()
+    yield "duty point", enter_duty_point
+
+    def search():
+        find_button(at, "Search").click()
+        at.run()
+    yield "search", search
+
+    def tick_pumps():
+        results = at.session_state["filtered_pumps"]
+        count = min(len(results), rnd.randint(1, 4)) if results is not None else 0
+        at.session_state["pump_table_editor"] = {
+            "edited_rows": {row: {"Select": True} for row in range(count)},
+            "added_rows": [], "deleted_rows": [],
+        }
+        at.run()
+    yield "tick pumps", tick_pumps
+
+    def change_units():
+        flow_unit = next(radio for radio in at.radio if radio.label == "Flow Unit")
+        flow_unit.set_value(rnd.choice(["m³/hr", "US gpm", "L/sec"]))
+        at.run()
+    yield "units", change_units
+
+
+def run_session(session_id, iterations, seed, timeout):
+    """Run one simulated visit, returning its step timings and the still open session"""
+    from streamlit.testing.v1 import AppTest
+    rnd = random.Random(seed + session_id)
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    timings = []
+    for _ in range(iterations):
+        for step, action in session_script(at, rnd):
+            started = time.perf_counter()
+            action()
+            timings.append((step, time.perf_counter() - started))
+            if at.exception:
+                raise RuntimeError(f"session {session_id} failed at '{step}': {at.exception[0].value}")
+    return timings, at
+
+
+def session_state_bytes(at):
+    try:
+        return len(pickle.dumps(at.session_state.to_dict()))
+    except Exception:
+        return None
+
+
+def read_cache_stats(timeout):
+    """Open one more session with ?diagnostics=1 and read the cache stats it shows.
+
+    The panel only exists when SHOW_DIAGNOSTICS is set, which main() does.
+    """
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    at.query_params["diagnostics"] = "1"
+    at.run()
+    for element in at.sidebar.get("json"):
+        return json.loads(element.proto.body)
+    return {}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    index = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def rss_bytes():
+    """Resident memory of this process, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def hit_rate(hits, misses):
+    total = hits + misses
+    return hits / total if total else float("nan")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent simulated sessions")
+    parser.add_argument("--iterations", type=int, default=1, help="script passes per session")
+    parser.add_argument("--pumps", type=int, default=2000, help="rows in the fake catalog")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated Supabase latency per page")
+    parser.add_argument("--catalog-ttl", type=float, default=1.0, help="seconds before the app checks for new data")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds allowed per rerun")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if the p95 rerun latency is higher")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    client = FakeSupabase(make_tables(args.pumps, args.seed), latency=args.latency_ms / 1000)
+    install_fake_supabase(client)
+    share_script_bytecode()
+    keep_runtime_between_runs()
+    os.environ["SHOW_DIAGNOSTICS"] = "1"
+    os.environ["CATALOG_TTL"] = str(args.catalog_ttl)
+
+    # One session first pays the costs every later session shares: importing
+    # Streamlit, Plotly, SciPy and Matplotlib and loading the catalog
+    rss_start = rss_bytes()
+    started = time.perf_counter()
+    run_session(-1, 1, args.seed, args.timeout)
+    warmup = time.perf_counter() - started
+
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        results = list(pool.map(
+            lambda session_id: run_session(session_id, args.iterations, args.seed, args.timeout),
+            range(args.sessions)
+        ))
+    elapsed = time.perf_counter() - started
+    # Taken while every session is still open, so their state is counted
+    rss_after = rss_bytes()
+
+    timings = [timing for session_timings, _ in results for timing in session_timings]
+    latencies = [seconds * 1000 for _, seconds in timings]
+    state_sizes = [size for size in (session_state_bytes(at) for _, at in results) if size is not None]
+    del results
+    stats = read_cache_stats(args.timeout)
+    catalog, figures, reports = stats.get("catalog", {}), stats.get("figures", {}), stats.get("reports", {})
+    report = {
+        "sessions": args.sessions,
+        "warmup_s": round(warmup, 2),
+        "reruns": len(latencies),
+        "elapsed_s": round(elapsed, 2),
+        "reruns_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "max_ms": round(max(latencies), 1) if latencies else None,
+        "p95_ms_by_step": {
+            step: round(percentile([seconds * 1000 for name, seconds in timings if name == step], 95), 1)
+            for step in dict.fromkeys(name for name, _ in timings)
+        },
+        "session_state_kb": round(sum(state_sizes) / len(state_sizes) / 1024, 1) if state_sizes else None,
+        "rss_fixed_mb": round((rss_before - rss_start) / 2**20, 1)
+        if rss_start is not None and rss_before is not None else None,
+        "rss_per_session_kb": round((rss_after - rss_before) / args.sessions / 1024, 1)
+        if rss_before is not None and rss_after is not None else None,
+        "supabase_requests": client.requests,
+        "catalog_checks": catalog.get("checks"),
+        "catalog_loads": catalog.get("loads"),
+        "catalog_hit_rate": round(1 - catalog["loads"] / catalog["reads"], 3) if catalog.get("reads") else None,
+        "figure_hit_rate": round(hit_rate(figures.get("hits", 0), figures.get("misses", 0)), 3),
+        "report_hit_rate": round(hit_rate(reports.get("hits", 0), reports.get("misses", 0)), 3),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>20}: {value}")
+
+    if args.max_p95_ms is not None and report["p95_ms"] > args.max_p95_ms:
+        print(f"p95 rerun latency {report['p95_ms']} ms exceeds {args.max_p95_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,49 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from supabase import create_client
+import hashlib
+import io
+import itertools
+import json
+import numpy as np
 import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+# Plotly, Supabase, SciPy and Matplotlib are imported where they are first
+# needed, so the page can start rendering before they are loaded
+
 # --- Environment Setup ---
 load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+CATALOG_SOURCES = os.getenv("CATALOG_SOURCES")  # JSON, or path to a JSON file, see load_source_config
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", 60))  # seconds before the catalog is refreshed in the background
+CATALOG_MEMORY_MB = float(os.getenv("CATALOG_MEMORY_MB", 512))  # idle tenants are evicted above this
+SHOW_DIAGNOSTICS = os.getenv("SHOW_DIAGNOSTICS", "").lower() in ("1", "true", "yes")  # allows ?diagnostics=1
+FIGURE_CACHE_SIZE = 256  # curve figures shared between sessions
+MAX_CURVE_POINTS = 200  # longer curves are downsampled before plotting
+WEBGL_MIN_POINTS = 100  # curves with more points are drawn with WebGL
+COVERAGE_FLOW_BINS = 40  # log-spaced flow cells in the coverage grid
+COVERAGE_HEAD_BINS = 40  # log-spaced head cells in the coverage grid
+ALTERNATIVE_COUNT = 5  # closest pumps suggested when a search finds nothing
+VARIABLE_SPEED_CATEGORIES = ["BLDC"]  # categories whose pumps can run below nominal speed
+SPEED_STEPS = 33  # speeds tried per pump when solving the affinity laws
+SPEED_BISECTIONS = 16  # halvings refining the required speed between two tried speeds
+EXPORT_WORKERS = 2  # background threads rendering report exports
+EXPORT_CACHE_SIZE = 64  # rendered reports kept for repeated downloads
+EXPORT_CHART_MODELS = 8  # results charted when no pump is selected
+EXPORT_TABLE_ROWS = 25  # table rows per PDF page
+EXPORT_FORMATS = {
+    "PDF": ("application/pdf", "pdf"),
+    "PNG": ("image/png", "png"),
+    "XLSX": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+CURVE_COLORS = ['blue', 'red', 'green', 'orange', 'purple', 'brown', 'pink', 'gray']
 
 # --- Language Support ---
 # Translation dictionary with ALL categories from your database
@@ -21,6 +56,7 @@ translations = {
         
         # Buttons
         "Refresh Data": "🔄 Refresh Data",
+        "Refreshing Data": "Refreshing data in the background...",
         "Reset Inputs": "🔄 Reset Inputs",
         "Search": "🔍 Search",
         "Show Curve": "📈 Show Pump Curve",
@@ -117,6 +153,54 @@ translations = {
         "Loading Comparison": "Loading comparison chart...",
         "Update Curves": "📈 Update Curves",
         "Selected Pumps": "Selected {count} pump(s) for curve visualization",
+        "View Individual Curves": "View Individual Pump Curves",
+        
+        # Coverage map
+        "Coverage Map": "### 🗺️ Catalog Coverage Map",
+        "Show Coverage Map": "Show coverage map for the selected category, frequency and phase",
+        "Coverage Caption": "Number of pumps whose curve reaches each flow/head region",
+        "Coverage Title": "Catalog Coverage",
+        "Pump Count": "Pumps",
+        "Nearest Pumps": "Closest pumps at your operating point",
+        "No Coverage": "No pump curve in this selection reaches your operating point.",
+        "No Coverage Data": "No curve data available to build the coverage map.",
+        "Flow At Head": "Flow at your head ({unit})",
+        "Flow Margin": "Flow margin (%)",
+        
+        # Multiple duty points
+        "Multi Duty": "Search with multiple duty points",
+        "Duty Points Caption": "Enter one operating point per row. Pumps whose curve reaches every point are listed first, then those reaching the most points.",
+        "Duty Flow": "Flow ({unit})",
+        "Duty Head": "Head ({unit})",
+        "Points Met": "Duty Points Met",
+        
+        # Variable speed
+        "Variable Speed": "Allow variable speed (affinity laws)",
+        "Variable Speed Caption": "BLDC pumps may run below nominal speed, and pumps listed only at another frequency are scaled to the selected one.",
+        "Min Speed": "Minimum speed (%)",
+        "Required Speed": "Required Speed (%)",
+        "Required Frequency": "Required Frequency (Hz)",
+        
+        # Report export
+        "Export Report": "### 📄 Export Report",
+        "Export Caption": "Includes the matching pumps table, the performance chart of the selected pumps (or the first {count} results) and your operating point.",
+        "Export Format": "Format",
+        "Generate Report": "📄 Generate Report",
+        "Generating Report": "Generating report in the background...",
+        "Download Report": "⬇️ Download {format}",
+        "Failed Report": "❌ Failed to generate report: {error}",
+        "Report Title": "Pump Selection Report",
+        
+        # Alternatives when nothing matches
+        "Nearest Alternatives": "#### 🔎 Closest Alternatives",
+        "Alternatives Caption": "These pumps are the closest to your criteria. The last column shows what each one misses.",
+        "Missed Criteria": "Missed Criteria",
+        "Flow Short": "flow {amount} {unit} short",
+        "Head Short": "head {amount} {unit} short",
+        "Solids Short": "solids passage {amount} mm short",
+        "Other Category": "category: {value}",
+        "Other Frequency": "frequency: {value} Hz",
+        "Other Phase": "phase: {value}",
         
         # Column headers - UPDATED FOR NEW FIELDS
         "Q Rated/LPM": "Q Rated/LPM",
@@ -144,7 +228,8 @@ translations = {
         "Failed Data": "❌ Failed to load data from Supabase: {error}",
         "Failed CSV": "❌ Failed to load CSV file: {error}",
         "No Data": "❌ No pump data available. Please check your Supabase connection or CSV file.",
-        "Failed Curve Data": "❌ Failed to load curve data: {error}"
+        "Failed Curve Data": "❌ Failed to load curve data: {error}",
+        "Unknown Catalog": "❌ Unknown catalog: {tenant}"
     },
     "繁體中文": {
         # App title and headers
@@ -154,6 +239,7 @@ translations = {
         
         # Buttons
         "Refresh Data": "🔄 刷新資料",
+        "Refreshing Data": "正在背景刷新資料...",
         "Reset Inputs": "🔄 重置輸入",
         "Search": "🔍 搜尋",
         "Show Curve": "📈 顯示泵浦曲線",
@@ -250,6 +336,54 @@ translations = {
         "Loading Comparison": "載入比較圖表中...",
         "Update Curves": "📈 更新曲線",
         "Selected Pumps": "已選擇 {count} 個幫浦進行曲線視覺化",
+        "View Individual Curves": "查看個別幫浦曲線",
+        
+        # Coverage map
+        "Coverage Map": "### 🗺️ 產品涵蓋範圍圖",
+        "Show Coverage Map": "顯示所選類別、頻率和相數的涵蓋範圍圖",
+        "Coverage Caption": "各流量/揚程區域內性能曲線可達的幫浦數量",
+        "Coverage Title": "產品涵蓋範圍",
+        "Pump Count": "幫浦數量",
+        "Nearest Pumps": "最接近您操作點的幫浦",
+        "No Coverage": "此選擇中沒有幫浦曲線能達到您的操作點。",
+        "No Coverage Data": "無曲線資料可建立涵蓋範圍圖。",
+        "Flow At Head": "您揚程下的流量 ({unit})",
+        "Flow Margin": "流量餘裕 (%)",
+        
+        # Multiple duty points
+        "Multi Duty": "使用多個操作點搜尋",
+        "Duty Points Caption": "每列輸入一個操作點。曲線能達到所有操作點的幫浦排在最前，其次為達到最多操作點的幫浦。",
+        "Duty Flow": "流量 ({unit})",
+        "Duty Head": "揚程 ({unit})",
+        "Points Met": "達到的操作點",
+        
+        # Variable speed
+        "Variable Speed": "允許變速運轉 (相似定律)",
+        "Variable Speed Caption": "無刷直流泵可低於額定轉速運轉，僅有其他頻率資料的幫浦會換算至所選頻率。",
+        "Min Speed": "最低轉速 (%)",
+        "Required Speed": "所需轉速 (%)",
+        "Required Frequency": "所需頻率 (赫茲)",
+        
+        # Report export
+        "Export Report": "### 📄 匯出報告",
+        "Export Caption": "包含符合的幫浦表格、所選幫浦 (或前 {count} 筆結果) 的性能曲線圖以及您的操作點。",
+        "Export Format": "格式",
+        "Generate Report": "📄 產生報告",
+        "Generating Report": "正在背景產生報告...",
+        "Download Report": "⬇️ 下載 {format}",
+        "Failed Report": "❌ 產生報告失敗: {error}",
+        "Report Title": "幫浦選型報告",
+        
+        # Alternatives when nothing matches
+        "Nearest Alternatives": "#### 🔎 最接近的替代選擇",
+        "Alternatives Caption": "以下幫浦最接近您的條件，最後一欄顯示各自未達到的條件。",
+        "Missed Criteria": "未達條件",
+        "Flow Short": "流量不足 {amount} {unit}",
+        "Head Short": "揚程不足 {amount} {unit}",
+        "Solids Short": "通過固體尺寸不足 {amount} 毫米",
+        "Other Category": "類別: {value}",
+        "Other Frequency": "頻率: {value} 赫茲",
+        "Other Phase": "相數: {value}",
         
         # Column headers - UPDATED FOR NEW FIELDS
         "Q Rated/LPM": "額定流量 (LPM)",
@@ -277,7 +411,8 @@ translations = {
         "Failed Data": "❌ 從 Supabase 載入資料失敗: {error}",
         "Failed CSV": "❌ 載入 CSV 檔案失敗: {error}",
         "No Data": "❌ 無可用幫浦資料。請檢查您的 Supabase 連接或 CSV 檔案。",
-        "Failed Curve Data": "❌ 載入曲線資料失敗: {error}"
+        "Failed Curve Data": "❌ 載入曲線資料失敗: {error}",
+        "Unknown Catalog": "❌ 未知的型錄: {tenant}"
     }
 }
 
@@ -336,149 +471,1278 @@ def convert_head_to_m(value, from_unit):
         return value * 0.3048
     return value
 
-@st.cache_resource
-def init_connection():
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+def fetch_table(client, table_name, page_size=1000):
+    """Fetch every row of a Supabase table, one page at a time"""
+    all_records, current_page = [], 0
+    while True:
+        response = client.table(table_name).select("*") \
+            .range(current_page * page_size, (current_page + 1) * page_size - 1).execute()
+        if not response.data:
+            break
+        all_records.extend(response.data)
+        current_page += 1
+        if len(response.data) < page_size:
+            break
+    return pd.DataFrame(all_records)
 
-@st.cache_data(ttl=60)
-def load_pump_data():
+def file_version(*paths):
+    """Modification times of the given files, or None if one is missing"""
     try:
-        all_records, page_size, current_page = [], 1000, 0
-        while True:
-            response = supabase.table("pump_selection_data").select("*") \
-                .range(current_page * page_size, (current_page + 1) * page_size - 1).execute()
-            if not response.data:
-                break
-            all_records.extend(response.data)
-            current_page += 1
-            if len(response.data) < page_size:
-                break
-        df = pd.DataFrame(all_records)
-        return df
-    except Exception as e:
-        st.error(get_text("Failed Data", error=str(e)))
+        return tuple(os.path.getmtime(path) for path in paths if path)
+    except OSError:
+        return None
+
+class SupabaseSource:
+    """Pump and curve tables in a Supabase project.
+
+    ``version`` asks each table for its row count and latest
+    ``updated_column`` value, which catches inserts, deletes and (with a
+    trigger maintaining the column) edits without fetching any rows. Tables
+    without that column cannot be probed, so they are fetched again on every
+    TTL expiry.
+    """
+    def __init__(self, url=None, key=None, pump_table="pump_selection_data", curve_table="pump_curve_data",
+                 updated_column="updated_at"):
+        self.url = url or SUPABASE_URL
+        self.key = key or SUPABASE_KEY
+        self.tables = {"pumps": pump_table, "curves": curve_table}
+        self.updated_column = updated_column
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from supabase import create_client
+                self._client = create_client(self.url, self.key)
+            return self._client
+
+    def fetch(self, table):
+        return fetch_table(self.client(), self.tables[table])
+
+    def version(self):
+        if not self.updated_column:
+            return None
         try:
-            return pd.read_csv("Pump Selection Data.csv")
-        except Exception as csv_error:
-            st.error(get_text("Failed CSV", error=str(csv_error)))
+            return tuple(self._probe(table_name) for table_name in self.tables.values())
+        except Exception:
+            return None
+
+    def _probe(self, table_name):
+        response = self.client().table(table_name).select(self.updated_column, count="exact") \
+            .order(self.updated_column, desc=True, nullsfirst=False).limit(1).execute()
+        return response.count, response.data[0][self.updated_column] if response.data else None
+
+class FileSource:
+    """Pump and curve tables in local CSV or Parquet files"""
+    def __init__(self, pumps, curves=None):
+        self.paths = {"pumps": pumps, "curves": curves}
+
+    def fetch(self, table):
+        path = self.paths[table]
+        if not path:
             return pd.DataFrame()
+        if path.lower().endswith((".parquet", ".pq")):
+            return pd.read_parquet(path)
+        return pd.read_csv(path)
+
+    def version(self):
+        return file_version(*self.paths.values())
 
-@st.cache_data(ttl=60)
-def load_pump_curve_data():
+class SQLiteSource:
+    """Pump and curve tables in a local SQLite database"""
+    def __init__(self, path, pump_table="pump_selection_data", curve_table="pump_curve_data"):
+        self.path = path
+        self.tables = {"pumps": pump_table, "curves": curve_table}
+
+    def fetch(self, table):
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            name = self.tables[table].replace('"', '""')
+            return pd.read_sql_query(f'SELECT * FROM "{name}"', connection)
+        finally:
+            connection.close()
+
+    def version(self):
+        return file_version(self.path)
+
+SOURCE_TYPES = {"supabase": SupabaseSource, "files": FileSource, "sqlite": SQLiteSource}
+
+def make_source(config):
+    """Build a data source from its config, e.g. {"type": "sqlite", "path": "acme.db"}"""
+    options = {name: value for name, value in config.items() if name not in ("type", "fallback")}
+    return SOURCE_TYPES[config["type"]](**options)
+
+def load_source_config():
+    """Catalog source configs by tenant name.
+
+    CATALOG_SOURCES holds a JSON object, or the path of a JSON file, such as
+    {"acme": {"type": "sqlite", "path": "acme.db"},
+     "beta": {"type": "files", "pumps": "beta.parquet", "curves": "beta_curves.csv"}}
+    Any source may name a "fallback" source used while it is unavailable.
+    Without it a single default catalog is served from Supabase, falling
+    back to the bundled CSV files.
+    """
+    if not CATALOG_SOURCES:
+        return {DEFAULT_TENANT: {
+            "type": "supabase",
+            "fallback": {"type": "files", "pumps": "Pump Selection Data.csv", "curves": "pump_curve_data_rows 1.csv"},
+        }}
+    if CATALOG_SOURCES.lstrip().startswith("{"):
+        return json.loads(CATALOG_SOURCES)
+    with open(CATALOG_SOURCES, encoding="utf-8") as f:
+        return json.load(f)
+
+def load_table(source, fallback, table, error_key, errors):
+    """Load a table from the tenant's source, falling back to its fallback source.
+
+    Runs outside the script thread, so failures are collected in ``errors``
+    as (translation key, message) pairs instead of being shown directly.
+    """
     try:
-        all_records, page_size, current_page = [], 1000, 0
-        while True:
-            response = supabase.table("pump_curve_data").select("*") \
-                .range(current_page * page_size, (current_page + 1) * page_size - 1).execute()
-            if not response.data:
-                break
-            all_records.extend(response.data)
-            current_page += 1
-            if len(response.data) < page_size:
-                break
-        df = pd.DataFrame(all_records)
-        return df
+        return source.fetch(table), True
     except Exception as e:
-        st.error(get_text("Failed Curve Data", error=str(e)))
+        errors.append((error_key, str(e)))
+        if fallback is None:
+            return pd.DataFrame(), False
         try:
-            return pd.read_csv("pump_curve_data_rows 1.csv")
-        except Exception as csv_error:
-            st.error(get_text("Failed CSV", error=str(csv_error)))
+            return fallback.fetch(table), False
+        except Exception as fallback_error:
+            errors.append(("Failed CSV", str(fallback_error)))
+            return pd.DataFrame(), False
+
+def parse_head_columns(curve_data):
+    """Return (column, head in m) pairs for the head columns of the curve table"""
+    head_columns = []
+    for col in curve_data.columns:
+        if col.endswith('M') and col not in ['Max Head(M)']:
+            try:
+                head_columns.append((col, float(col.replace('M', ''))))
+            except ValueError:
+                continue
+    return head_columns
+
+def table_digest(table):
+    """Fingerprint of a table's contents, to tell whether a reload changed anything"""
+    try:
+        hashes = pd.util.hash_pandas_object(table, index=False)
+    except TypeError:
+        # Columns holding lists or dicts (JSON columns) cannot be hashed directly
+        hashes = pd.util.hash_pandas_object(table.astype(str), index=False)
+    digest = hashlib.sha1(hashes.to_numpy().tobytes())
+    digest.update("\0".join(map(str, table.columns)).encode())
+    return digest.hexdigest()
+
+def prepare_pumps(pumps):
+    """Normalize the columns used by the Step 1 filters"""
+    if "Category" in pumps.columns:
+        pumps["Category"] = pumps["Category"].astype(str).str.strip().replace(["nan", "None", "NaN"], "")
+    if "Frequency (Hz)" in pumps.columns:
+        pumps["Frequency (Hz)"] = pd.to_numeric(pumps["Frequency (Hz)"], errors='coerce')
+    if "Phase" in pumps.columns:
+        pumps["Phase"] = pd.to_numeric(pumps["Phase"], errors='coerce')
+    return pumps
+
+class CurveStore:
+    """Compact storage of every pump curve.
+
+    The points of all curves live in two float32 arrays (flow in LPM, head
+    in m) grouped by model, CSR style: the points of model row i are
+    ``offsets[i]:offsets[i + 1]``, in ascending head order. ``index`` maps a
+    model number to its row and ``head_grid`` holds the distinct heads, so
+    nothing is parsed again after loading.
+    """
+    LONG_COLUMNS = {
+        "model": ["Model No.", "model", "model_no"],
+        "head": ["Head (M)", "head", "head_m"],
+        "flow": ["Flow (LPM)", "flow", "flow_lpm"],
+    }
+
+    def __init__(self, models, offsets, flows, heads):
+        self.models = np.asarray(models, dtype=object)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.flows = np.asarray(flows, dtype=np.float32)
+        self.heads = np.asarray(heads, dtype=np.float32)
+        self.index = {model: i for i, model in enumerate(self.models)}
+        self.head_grid = np.unique(self.heads)
+
+    def __len__(self):
+        return len(self.models)
+
+    @property
+    def digest(self):
+        """Fingerprint of every curve, to tell whether a reload changed anything"""
+        digest = hashlib.sha1("\0".join(map(str, self.models)).encode())
+        for array in (self.offsets, self.flows, self.heads):
+            digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    def __contains__(self, model_no):
+        return model_no in self.index
+
+    def points(self, model_no):
+        """Return a model's curve as (flows in LPM, heads in m) sorted by flow, or None"""
+        row = self.index.get(model_no)
+        if row is None:
+            return None
+        flows = self.flows[self.offsets[row]:self.offsets[row + 1]].astype(float)
+        heads = self.heads[self.offsets[row]:self.offsets[row + 1]].astype(float)
+        order = np.lexsort((heads, flows))
+        return flows[order], heads[order]
+
+    @classmethod
+    def from_frame(cls, curve_data):
+        """Build the store from a wide table (one "<head>M" column per head) or
+        a long table with one (model, head, flow) row per point"""
+        long_columns = [next((col for col in names if col in curve_data.columns), None)
+                        for names in cls.LONG_COLUMNS.values()]
+        if all(long_columns):
+            return cls.from_long(curve_data, *long_columns)
+        return cls.from_wide(curve_data)
+
+    @classmethod
+    def from_wide(cls, curve_data):
+        head_columns = sorted(parse_head_columns(curve_data), key=lambda col_head: col_head[1])
+        if "Model No." not in curve_data.columns or not head_columns:
+            return cls([], [0], [], [])
+        rows = curve_data.drop_duplicates("Model No.")
+        values = rows[[col for col, _ in head_columns]].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32)
+        grid = np.array([head for _, head in head_columns], dtype=np.float32)
+        valid = ~np.isnan(values) & (values > 0)
+        offsets = np.concatenate([[0], np.cumsum(valid.sum(axis=1))])
+        return cls(rows["Model No."].to_numpy(), offsets, values[valid], np.broadcast_to(grid, values.shape)[valid])
+
+    @classmethod
+    def from_long(cls, curve_data, model_column, head_column, flow_column):
+        data = pd.DataFrame({
+            "model": curve_data[model_column],
+            "head": pd.to_numeric(curve_data[head_column], errors='coerce'),
+            "flow": pd.to_numeric(curve_data[flow_column], errors='coerce'),
+        }).dropna(subset=["model"])
+        models = pd.unique(data["model"])
+        data = data[data["head"].notna() & data["flow"].notna() & (data["flow"] > 0)]
+        codes = pd.Categorical(data["model"], categories=models).codes
+        heads, flows = data["head"].to_numpy(), data["flow"].to_numpy()
+        order = np.lexsort((heads, codes))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(models)))])
+        return cls(models, offsets, flows[order], heads[order])
+
+class CurveMatrix:
+    """Flow of every pump curve sampled on the common head grid of the curve store.
+
+    ``flows`` is a (models x heads) array in LPM, so whole-catalog questions
+    become array operations. Heads above a curve's last point are NaN: the
+    pump cannot reach them. Heads below its first point hold the flow of
+    that point, a safe lower bound since flow only rises as head falls.
+    """
+    def __init__(self, curves):
+        self.models = curves.models
+        self.rows = curves.index
+        self.heads = curves.head_grid
+        flows = np.full((len(curves), len(self.heads)), np.nan, dtype=np.float32)
+        point_rows = np.repeat(np.arange(len(curves)), np.diff(curves.offsets))
+        flows[point_rows, np.searchsorted(self.heads, curves.heads)] = curves.flows
+        # Curves not sampled at every grid head are interpolated between their own points
+        missing = np.isnan(flows)
+        if missing.any():
+            columns = np.arange(len(self.heads))
+            before = np.maximum.accumulate(np.where(missing, -1, columns), axis=1)
+            after = np.minimum.accumulate(np.where(missing, len(columns), columns)[:, ::-1], axis=1)[:, ::-1]
+            inside = missing & (before >= 0) & (after < len(columns))
+            leading = missing & (before < 0) & (after < len(columns))
+            before, after = np.clip(before, 0, len(columns) - 1), np.clip(after, 0, len(columns) - 1)
+            span = self.heads[after] - self.heads[before]
+            t = (self.heads - self.heads[before]) / np.where(span > 0, span, 1)
+            flow_before = np.take_along_axis(flows, before, axis=1)
+            flow_after = np.take_along_axis(flows, after, axis=1)
+            flows = np.where(inside, flow_before + (flow_after - flow_before) * t, flows)
+            flows = np.where(leading, flow_after, flows)
+        self.flows = flows
+
+    def flow_at(self, heads, rows=None):
+        """Interpolate the flow (LPM) of each curve at the given heads (m).
+
+        ``heads`` is either one list shared by every curve or a (rows x k)
+        array with separate heads per curve; the result is (rows x heads).
+        Heads below the first grid head use the first column. Heads above a
+        curve's last point get no flow, and no flow is interpolated towards them.
+        """
+        flows = self.flows if rows is None else self.flows[rows]
+        heads = np.asarray(heads, dtype=np.float32)
+        heads = np.broadcast_to(np.atleast_1d(heads), (len(flows), heads.shape[-1] if heads.ndim else 1))
+        if not len(self.heads):
+            return np.zeros(heads.shape, dtype=np.float32)
+        j = np.clip(np.searchsorted(self.heads, heads, side='right') - 1, 0, len(self.heads) - 1)
+        j_next = np.minimum(j + 1, len(self.heads) - 1)
+        span = self.heads[j_next] - self.heads[j]
+        t = np.clip((heads - self.heads[j]) / np.where(span > 0, span, 1), 0, 1)
+        low, high = np.take_along_axis(flows, j, axis=1), np.take_along_axis(flows, j_next, axis=1)
+        result = np.where(t > 0, low * (1 - t) + high * t, low)
+        result[heads > self.heads[-1]] = 0
+        return np.nan_to_num(result, nan=0.0)
+
+    def required_speed(self, flow, head, rows, min_ratio, max_ratio, steps=SPEED_STEPS, bisections=SPEED_BISECTIONS):
+        """Lowest speed ratio at which each curve reaches a duty point.
+
+        By the affinity laws a curve run at speed ratio r delivers
+        r * Q(H / r**2), which only grows with r. Every row is tried at
+        ``steps`` speeds between its own min_ratio and max_ratio in one batch,
+        and the answer is then bisected between the last speed falling short
+        and the first one reaching the point, so the speed returned always
+        reaches it. NaN marks curves that cannot reach it.
+        """
+        rows = np.asarray(rows, dtype=int)
+        min_ratio = np.broadcast_to(np.asarray(min_ratio, dtype=np.float32), rows.shape)
+        max_ratio = np.broadcast_to(np.asarray(max_ratio, dtype=np.float32), rows.shape)
+        ratios = min_ratio[:, None] + (max_ratio - min_ratio)[:, None] * np.linspace(0, 1, steps, dtype=np.float32)
+        margin = ratios * self.flow_at(head / ratios ** 2, rows) - flow
+        reached = margin >= 0
+        first = reached.argmax(axis=1)[:, None]
+        low = np.take_along_axis(ratios, np.maximum(first - 1, 0), axis=1)
+        high = np.take_along_axis(ratios, first, axis=1)
+        for _ in range(bisections):
+            middle = (low + high) / 2
+            middle_reached = middle * self.flow_at(head / middle ** 2, rows) >= flow
+            low, high = np.where(middle_reached, low, middle), np.where(middle_reached, middle, high)
+        return np.where(reached.any(axis=1), high[:, 0], np.nan)
+
+class CoverageIndex:
+    """Rasterized Q–H coverage of every pump curve on a log-spaced grid.
+
+    A pump covers a cell when its curve delivers at least the cell's flow
+    at the cell's head. Because that is monotonic in flow, each pump only
+    stores how many flow cells it reaches in every head row (``reach``).
+
+    Duty point lookups need every pump reaching *any* point of a cell, so
+    ``bound`` counts the flow cells whose lower edge a pump reaches with the
+    most flow it delivers anywhere in the head row. Pumps are kept sorted by
+    bound per head row, making the candidates for a cell a prefix of that
+    order, which is then checked against the exact curves.
+    """
+    def __init__(self, curve_matrix, pumps, flow_bins=COVERAGE_FLOW_BINS, head_bins=COVERAGE_HEAD_BINS):
+        self.curve_matrix = curve_matrix
+        positive_flows = curve_matrix.flows[curve_matrix.flows > 0]
+        positive_heads = curve_matrix.heads[(curve_matrix.heads > 0) & (curve_matrix.flows > 0).any(axis=0)]
+        self.empty = not positive_flows.size or not positive_heads.size
+        if self.empty:
+            positive_flows = positive_heads = np.array([1.0], dtype=np.float32)
+        self.flow_edges = np.geomspace(positive_flows.min(), positive_flows.max() * 1.0001, flow_bins + 1)
+        self.head_edges = np.geomspace(positive_heads.min(), positive_heads.max() * 1.0001, head_bins + 1)
+        self.flow_centers = np.sqrt(self.flow_edges[:-1] * self.flow_edges[1:])
+        self.head_centers = np.sqrt(self.head_edges[:-1] * self.head_edges[1:])
+        flows_at_centers = curve_matrix.flow_at(self.head_centers)
+        self.reach = np.searchsorted(self.flow_centers, flows_at_centers, side='right').astype(np.int16)
+        self.order = np.argsort(-self.reach, axis=0, kind='stable')
+        self.bound = np.searchsorted(self.flow_edges[:-1], self._peak_flows(), side='right').astype(np.int16)
+        self.bound_order = np.argsort(-self.bound, axis=0, kind='stable')
+        self.sorted_bound = np.take_along_axis(self.bound, self.bound_order, axis=0)
+
+        # A model can be listed more than once (e.g. at 50 and 60 Hz), so the
+        # attributes are kept per pump row along with the curve row it uses
+        pump_rows = pumps["Model No."].map(curve_matrix.rows) if "Model No." in pumps.columns else pd.Series(dtype=float)
+        has_curve = pump_rows.notna().to_numpy()
+        attributes = pumps[has_curve] if "Model No." in pumps.columns else pd.DataFrame()
+        self.model_rows = pump_rows[has_curve].to_numpy(dtype=np.intp)
+        self.category = attributes["Category"].to_numpy() if "Category" in attributes.columns else np.full(len(attributes), None)
+        self.frequency = attributes["Frequency (Hz)"].to_numpy() if "Frequency (Hz)" in attributes.columns else np.full(len(attributes), np.nan)
+        self.phase = attributes["Phase"].to_numpy() if "Phase" in attributes.columns else np.full(len(attributes), np.nan)
+
+    def _peak_flows(self):
+        """Most flow each curve delivers within every head row, as (curves x head rows).
+
+        Curves are linear between grid heads, so the peak of a row lies on
+        its edges or on a grid head inside it.
+        """
+        grid = self.curve_matrix.heads
+        heads = np.union1d(self.head_edges, grid[(grid > self.head_edges[0]) & (grid < self.head_edges[-1])])
+        flows = self.curve_matrix.flow_at(heads)
+        starts = np.searchsorted(heads, self.head_edges[:-1])
+        ends = np.searchsorted(heads, self.head_edges[1:])
+        return np.maximum(np.maximum.reduceat(flows, starts, axis=1), flows[:, ends])
+
+    def select(self, category=None, frequency=None, phase=None):
+        """Boolean mask of the curves in a category / frequency / phase combination.
+
+        A curve is selected when any pump row using it matches all three.
+        """
+        if category is None and frequency is None and phase is None:
+            return np.ones(len(self.curve_matrix.models), dtype=bool)
+        matches = np.ones(len(self.model_rows), dtype=bool)
+        if category is not None:
+            matches &= self.category == category
+        if frequency is not None:
+            matches &= self.frequency == frequency
+        if phase is not None:
+            matches &= self.phase == phase
+        mask = np.zeros(len(self.curve_matrix.models), dtype=bool)
+        mask[self.model_rows[matches]] = True
+        return mask
+
+    def pumps_in_cell(self, j, i):
+        """Curve rows that may reach some point of a cell"""
+        count = np.searchsorted(-self.sorted_bound[:, j], -i, side='left')
+        return self.bound_order[:count, j]
+
+    def counts(self, mask):
+        """Number of selected pumps covering every cell, as a (heads x flows) array"""
+        n_flow = len(self.flow_centers)
+        reach = self.reach[mask].astype(np.int64) + (n_flow + 1) * np.arange(len(self.head_centers))
+        histogram = np.bincount(reach.ravel(), minlength=len(self.head_centers) * (n_flow + 1))
+        histogram = histogram.reshape(len(self.head_centers), n_flow + 1)
+        return np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1][:, 1:]
+
+    def cell_models(self, mask, limit=3):
+        """The closest-fitting selected models for every cell, as (heads x flows) lists"""
+        counts = self.counts(mask)
+        models = []
+        for j in range(len(self.head_centers)):
+            column = self.order[:, j]
+            column = column[mask[column]]
+            models.append([list(self.curve_matrix.models[column[max(0, n - limit):n]][::-1]) for n in counts[j]])
+        return counts, models
+
+    def nearest(self, flow, head, mask=None, limit=10):
+        """Pumps whose curve reaches a duty point, smallest flow margin first.
+
+        Candidates come straight from the grid cell holding the duty point;
+        only those are checked against their exact curves.
+        """
+        if self.empty or flow >= self.flow_edges[-1] or head >= self.head_edges[-1]:
+            return pd.DataFrame(columns=["Model No.", "Flow (LPM)"])
+        if head < self.head_edges[0]:
+            # Below the grid there is no cell to narrow the search, so every curve is checked
+            candidates = np.arange(len(self.curve_matrix.models))
+        else:
+            j = np.searchsorted(self.head_edges, head, side='right') - 1
+            i = max(np.searchsorted(self.flow_edges, flow, side='right') - 1, 0)
+            candidates = self.pumps_in_cell(j, i)
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        flows = self.curve_matrix.flow_at([head], candidates)[:, 0]
+        reaches = flows >= flow
+        candidates, flows = candidates[reaches], flows[reaches]
+        closest = np.argsort(flows - flow, kind='stable')[:limit]
+        return pd.DataFrame({
+            "Model No.": self.curve_matrix.models[candidates[closest]],
+            "Flow (LPM)": flows[closest],
+        })
+
+class AlternativeIndex:
+    """Nearest-neighbour lookup over (log flow, log head, particle size).
+
+    Each feature is scaled by its spread across the catalog so that no
+    single criterion dominates the distance. A KD-tree is built for every
+    combination of criteria actually used in a search, over the whole
+    catalog and over each category / frequency / phase subset searched,
+    at most once per catalog version.
+    """
+    FEATURES = ["Q Rated/LPM", "Head Rated/M", "Pass Solid Dia(mm)"]
+
+    def __init__(self, pumps):
+        self.values = np.column_stack([
+            pd.to_numeric(pumps[col], errors='coerce').fillna(0).clip(lower=0).to_numpy(dtype=float)
+            if col in pumps.columns else np.zeros(len(pumps))
+            for col in self.FEATURES
+        ]) if len(pumps) else np.zeros((0, len(self.FEATURES)))
+        features = self.values.copy()
+        features[:, :2] = np.log1p(features[:, :2])
+        scale = features.std(axis=0) if len(features) else np.ones(len(self.FEATURES))
+        self.scale = np.where(scale > 0, scale, 1)
+        self.features = features / self.scale
+        self.category = pumps["Category"].to_numpy() if "Category" in pumps.columns else np.full(len(pumps), None)
+        self.frequency = pumps["Frequency (Hz)"].to_numpy() if "Frequency (Hz)" in pumps.columns else np.full(len(pumps), np.nan)
+        self.phase = pumps["Phase"].to_numpy() if "Phase" in pumps.columns else np.full(len(pumps), np.nan)
+        self._trees = {}
+        self._lock = threading.Lock()
+
+    def _matches(self, category=None, frequency=None, phase=None):
+        matches = np.ones(len(self.features), dtype=bool)
+        if category is not None:
+            matches &= self.category == category
+        if frequency is not None:
+            matches &= self.frequency == frequency
+        if phase is not None:
+            matches &= self.phase == phase
+        return matches
+
+    def _tree(self, dims, match=None):
+        """KD-tree over the pumps matching (category, frequency, phase), or all of them, with their rows"""
+        from scipy.spatial import cKDTree
+        with self._lock:
+            if (dims, match) not in self._trees:
+                rows = np.arange(len(self.features)) if match is None else np.flatnonzero(self._matches(*match))
+                self._trees[dims, match] = cKDTree(self.features[rows][:, list(dims)]), rows
+            return self._trees[dims, match]
+
+    def _query(self, target, dims, k, match=None):
+        """Rows and distances of the k closest pumps, closest first"""
+        tree, rows = self._tree(dims, match)
+        k = min(k, len(rows))
+        if not k:
+            return np.array([], dtype=int), np.array([])
+        distance, found = tree.query(target[list(dims)], k=k)
+        return rows[np.atleast_1d(found)], np.atleast_1d(distance)
+
+    def nearest(self, flow=0, head=0, particle_size=0, category=None, frequency=None, phase=None, limit=ALTERNATIVE_COUNT):
+        """Return the closest pumps with how far each one misses every criterion.
+
+        Pumps that match the category, frequency and phase come first, the
+        closest of them found in a tree of that subset alone. Any places left
+        are filled from the closest pumps of the whole catalog, with fewer
+        mismatches first and the closest pump first among equals. The result
+        has one row per pump, indexed by its row in ``pumps``.
+        """
+        if not len(self.features):
             return pd.DataFrame()
+        target = np.array([np.log1p(flow), np.log1p(head), particle_size]) / self.scale
+        dims = tuple(d for d, value in enumerate((flow, head, particle_size)) if value > 0)
+        if dims:
+            if category is None and frequency is None and phase is None:
+                rows, distance = self._query(target, dims, limit)
+            else:
+                rows, distance = self._query(target, dims, limit, (category, frequency, phase))
+            if len(rows) < limit:
+                # Over-fetch so the fill-ins with the fewest mismatches can win
+                more_rows, more_distance = self._query(target, dims, max(limit * 20, 50))
+                new = ~np.isin(more_rows, rows)
+                rows = np.concatenate([rows, more_rows[new]])
+                distance = np.concatenate([distance, more_distance[new]])
+        else:
+            rows = np.arange(len(self.features))
+            distance = np.zeros(len(rows))
+        mismatches = np.zeros(len(rows), dtype=int)
+        other_category = np.zeros(len(rows), dtype=bool) if category is None else self.category[rows] != category
+        other_frequency = np.zeros(len(rows), dtype=bool) if frequency is None else self.frequency[rows] != frequency
+        other_phase = np.zeros(len(rows), dtype=bool) if phase is None else self.phase[rows] != phase
+        mismatches += other_category.astype(int) + other_frequency.astype(int) + other_phase.astype(int)
+        best = np.lexsort((distance, mismatches))[:limit]
+        rows = rows[best]
+        values = self.values[rows]
+        return pd.DataFrame({
+            "Flow Short (LPM)": np.maximum(flow - values[:, 0], 0) if flow > 0 else 0.0,
+            "Head Short (M)": np.maximum(head - values[:, 1], 0) if head > 0 else 0.0,
+            "Solids Short (mm)": np.maximum(particle_size - values[:, 2], 0) if particle_size > 0 else 0.0,
+            "Other Category": other_category[best],
+            "Other Frequency": other_frequency[best],
+            "Other Phase": other_phase[best],
+        }, index=rows)
 
-def create_pump_curve_chart(curve_data, model_no, user_flow=None, user_head=None, flow_unit="L/min", head_unit="m"):
-    head_columns = [col for col in curve_data.columns if col.endswith('M') and col not in ['Max Head(M)']]
-    fig = go.Figure()
-    pump_data = curve_data[curve_data['Model No.'] == model_no]
-    if pump_data.empty:
-        return None
-    pump_row = pump_data.iloc[0]
-    flows, heads = [], []
-    for col in head_columns:
-        try:
-            head_value = float(col.replace('M', ''))
-            flow_value = pd.to_numeric(pump_row[col], errors='coerce')
-            if not pd.isna(flow_value) and flow_value > 0:
-                # Convert from LPM and M to user's units
-                flows.append(convert_flow_from_lpm(flow_value, flow_unit))
-                heads.append(convert_head_from_m(head_value, head_unit))
-        except:
-            continue
-    if flows and heads:
-        sorted_data = sorted(zip(flows, heads))
-        flows, heads = zip(*sorted_data)
-        fig.add_trace(go.Scatter(
-            x=flows, y=heads, mode='lines+markers',
-            name=f'{model_no} - Head Curve',
-            line=dict(color='blue', width=3), marker=dict(size=8),
-            hovertemplate=f'Flow: %{{x:.2f}} {flow_unit}<br>Head: %{{y:.2f}} {head_unit}<extra></extra>'
-        ))
-    if user_flow and user_head and user_flow > 0 and user_head > 0:
-        # Convert user operating point to display units
-        display_flow = convert_flow_from_lpm(user_flow, flow_unit)
-        display_head = convert_head_from_m(user_head, head_unit)
-        fig.add_trace(go.Scatter(
-            x=[display_flow], y=[display_head], mode='markers',
-            name=get_text("Operating Point"),
-            marker=dict(size=15, color='red', symbol='star'),
-            hovertemplate=f'Flow: {display_flow:.2f} {flow_unit}<br>Head: {display_head:.2f} {head_unit}<extra></extra>'
-        ))
-    fig.update_layout(
-        title=get_text("Performance Curve", model=model_no),
-        xaxis_title=get_text("Flow Rate", unit=flow_unit), 
-        yaxis_title=get_text("Head", unit=head_unit),
-        hovermode='closest', showlegend=True, height=500, template='plotly_white'
+class Catalog:
+    """A loaded version of the pump tables together with its lookup indexes.
+
+    A catalog is never modified after it is built; refreshing the data
+    builds a new one and swaps it in, so sessions can keep reading the old
+    version while the new one loads. Only the pump table is loaded up
+    front: the curve table and every index are built the first time a
+    session needs them.
+    """
+    def __init__(self, pumps, load_curves, version, errors, from_source, tenant=DEFAULT_TENANT):
+        self.digest = table_digest(pumps)
+        self.pumps = prepare_pumps(pumps)
+        self.version = version
+        self.errors = errors
+        self.from_source = from_source
+        self.tenant = tenant
+        self.loaded_at = pd.Timestamp.now()
+        self._pumps_nbytes = int(self.pumps.memory_usage(deep=True).sum())
+        self._load_curves = load_curves
+        self._lock = threading.RLock()
+        self._curves = None
+        self._curve_matrix = None
+        self._coverage = None
+        self._alternatives = None
+
+    def _lazy(self, name, build):
+        value = getattr(self, name)
+        if value is None:
+            with self._lock:
+                value = getattr(self, name)
+                if value is None:
+                    value = build()
+                    setattr(self, name, value)
+        return value
+
+    @property
+    def key(self):
+        """Identifies this catalog in caches shared between tenants"""
+        return (self.tenant, self.version)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the pump table and the indexes built so far"""
+        total = self._pumps_nbytes
+        for part in (self._curves, self._curve_matrix, self._coverage, self._alternatives):
+            if part is not None:
+                total += sum(value.nbytes for value in vars(part).values() if isinstance(value, np.ndarray))
+        return total
+
+    def same_data(self, other):
+        """Whether another catalog holds the same tables as this one"""
+        if self.digest != other.digest or self.from_source != other.from_source:
+            return False
+        return not (self.curves_loaded and other.curves_loaded) or self.curves.digest == other.curves.digest
+
+    @property
+    def curves_loaded(self):
+        return self._curves is not None
+
+    @property
+    def curves(self):
+        return self._lazy("_curves", self._load_curves)
+
+    def preload_curves(self):
+        """Load the curve table now instead of on first use"""
+        self._lazy("_curves", self._load_curves)
+
+    @property
+    def curve_matrix(self):
+        return self._lazy("_curve_matrix", lambda: CurveMatrix(self.curves))
+
+    @property
+    def coverage(self):
+        return self._lazy("_coverage", lambda: CoverageIndex(self.curve_matrix, self.pumps))
+
+    @property
+    def alternatives(self):
+        return self._lazy("_alternatives", lambda: AlternativeIndex(self.pumps))
+
+def load_catalog(source, fallback, version, tenant=DEFAULT_TENANT):
+    errors = []
+    pumps, pumps_ok = load_table(source, fallback, "pumps", "Failed Data", errors)
+
+    def load_curves():
+        curve_data, _ = load_table(source, fallback, "curves", "Failed Curve Data", errors)
+        return CurveStore.from_frame(curve_data)
+
+    return Catalog(pumps, load_curves, version, errors, pumps_ok, tenant)
+
+class CatalogStore:
+    """Serves the current catalog and refreshes it without blocking readers.
+
+    Only the very first load is synchronous. Once a catalog exists, a stale
+    or explicitly refreshed catalog keeps being served while a single
+    background thread loads the next version; refresh requests made while
+    that thread is running are coalesced into it. Sources that can tell
+    whether their data changed are only reloaded when it did, and a reload
+    that finds the same data keeps the current catalog, its version and
+    every cache built for it.
+
+    Catalog versions are drawn from ``versions``, which may be shared with
+    other stores so that a version number is never handed out twice.
+    """
+    def __init__(self, source, fallback=None, tenant=DEFAULT_TENANT, ttl=CATALOG_TTL, versions=None):
+        self._source = source
+        self._fallback = fallback
+        self._tenant = tenant
+        self._ttl = ttl
+        self._versions = versions or itertools.count(1)
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._source_version = None
+        self._checked_at = 0.0
+        self._refresh_thread = None
+        self.refresh_error = None
+        self.reads = 0
+        self.checks = 0
+        self.loads = 0
+
+    def get(self):
+        with self._lock:
+            self.reads += 1
+            catalog = self._catalog
+        if catalog is None:
+            with self._lock:
+                if self._catalog is None:
+                    self.loads += 1
+                    self._source_version = self._source.version()
+                    self._catalog = load_catalog(self._source, self._fallback, next(self._versions), self._tenant)
+                    self._checked_at = time.monotonic()
+                return self._catalog
+        if time.monotonic() - self._checked_at > self._ttl:
+            self.refresh()
+        return catalog
+
+    def refresh(self, force=False):
+        """Start a background reload unless one is already running"""
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            self._checked_at = time.monotonic()
+            self._refresh_thread = threading.Thread(
+                target=self._reload, args=(force,), name=f"catalog-refresh-{self._tenant}", daemon=True
+            )
+            self._refresh_thread.start()
+            return True
+
+    @property
+    def nbytes(self):
+        catalog = self._catalog
+        return catalog.nbytes if catalog is not None else 0
+
+    def stats(self):
+        catalog = self._catalog
+        refreshing = self._refresh_thread is not None and self._refresh_thread.is_alive()
+        return {"version": catalog.version if catalog else None, "reads": self.reads, "checks": self.checks,
+                "loads": self.loads, "refreshing": refreshing, "mb": round(self.nbytes / 2**20, 1)}
+
+    def _reload(self, force=False):
+        current = self._catalog
+        source_version = self._source.version()
+        with self._lock:
+            self.checks += 1
+            if not force and current is not None and source_version is not None and source_version == self._source_version:
+                self._checked_at = time.monotonic()
+                return
+            self.loads += 1
+        catalog = load_catalog(self._source, self._fallback, next(self._versions), self._tenant)
+        if current is not None and current.curves_loaded:
+            # Sessions are already using curves, so load them here rather than on their next rerun
+            catalog.preload_curves()
+        with self._lock:
+            self._source_version = source_version
+            if current is not None and current is self._catalog and current.same_data(catalog):
+                if catalog.from_source:
+                    self.refresh_error = None
+                self._checked_at = time.monotonic()
+                return
+            # Keep serving the last good catalog rather than replacing it
+            # with the fallback when the source is briefly unavailable
+            if catalog.from_source or self._catalog is None or not self._catalog.from_source:
+                self._catalog = catalog
+                self.refresh_error = None
+            else:
+                self.refresh_error = catalog.errors
+            self._checked_at = time.monotonic()
+
+class CatalogRegistry:
+    """One CatalogStore per tenant, evicting idle tenants to bound memory.
+
+    Each tenant's catalog is cached and refreshed on its own. Once the
+    catalogs together hold more than ``max_bytes``, the least recently used
+    tenants are dropped and loaded again by their next visitor. Versions
+    come from one counter kept here, so a reloaded tenant never reuses the
+    cache keys of the catalog it had before eviction.
+    """
+    def __init__(self, sources, max_bytes=CATALOG_MEMORY_MB * 2**20):
+        self.sources = sources
+        self.max_bytes = max_bytes
+        self.default_tenant = DEFAULT_TENANT if DEFAULT_TENANT in sources else next(iter(sources), None)
+        self.evictions = 0
+        self._versions = itertools.count(1)
+        self._stores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, tenant):
+        return tenant in self.sources
+
+    def get(self, tenant):
+        with self._lock:
+            store = self._stores.get(tenant)
+            if store is None:
+                config = self.sources[tenant]
+                fallback = make_source(config["fallback"]) if config.get("fallback") else None
+                store = CatalogStore(make_source(config), fallback, tenant, versions=self._versions)
+                self._stores[tenant] = store
+            self._stores.move_to_end(tenant)
+            self._evict()
+            return store
+
+    def _evict(self):
+        sizes = {tenant: store.nbytes for tenant, store in self._stores.items()}
+        total = sum(sizes.values())
+        # The most recently used tenant is the one being served, so it always stays
+        for tenant in list(self._stores)[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= sizes[tenant]
+            del self._stores[tenant]
+            self.evictions += 1
+
+    def stats(self):
+        """Totals over all tenants; no tenant is named, since any tenant's page may show them"""
+        with self._lock:
+            stores = list(self._stores.values())
+        return {"loaded": len(stores), "mb": round(sum(store.nbytes for store in stores) / 2**20, 1),
+                "evictions": self.evictions}
+
+@st.cache_resource
+def get_catalog_registry():
+    return CatalogRegistry(load_source_config())
+
+_MISSING = object()
+
+class LRUCache:
+    """Thread-safe least-recently-used cache shared between sessions"""
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def get_or_create(self, key, factory):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+@st.cache_resource
+def get_figure_cache():
+    return LRUCache(FIGURE_CACHE_SIZE)
+
+def downsample_curve(flows, heads, max_points=MAX_CURVE_POINTS):
+    """Keep at most max_points evenly spaced points, always including both ends"""
+    if len(flows) <= max_points:
+        return flows, heads
+    keep = np.unique(np.linspace(0, len(flows) - 1, max_points).round().astype(int))
+    return flows[keep], heads[keep]
+
+def make_curve_trace(flows, heads, name, color, marker_size, flow_unit, head_unit):
+    import plotly.graph_objects as go
+    flows, heads = downsample_curve(flows, heads)
+    # float32 arrays are sent to the browser as compact typed arrays
+    x = convert_flow_from_lpm(flows, flow_unit).astype(np.float32)
+    y = convert_head_from_m(heads, head_unit).astype(np.float32)
+    trace_type = go.Scattergl if len(x) > WEBGL_MIN_POINTS else go.Scatter
+    return trace_type(
+        x=x, y=y, mode='lines+markers', name=name,
+        line=dict(color=color, width=3), marker=dict(size=marker_size),
+        hovertemplate=f'Flow: %{{x:.2f}} {flow_unit}<br>Head: %{{y:.2f}} {head_unit}<extra></extra>'
     )
-    return fig
 
-def create_comparison_chart(curve_data, model_nos, user_flow=None, user_head=None, flow_unit="L/min", head_unit="m"):
-    fig = go.Figure()
-    colors = ['blue', 'red', 'green', 'orange', 'purple', 'brown', 'pink', 'gray']
+def get_operating_points(user_flow, user_head):
+    """Valid (flow, head) operating points from single values or per-point lists"""
+    flows = np.atleast_1d(np.asarray(user_flow if user_flow is not None else 0, dtype=float))
+    heads = np.atleast_1d(np.asarray(user_head if user_head is not None else 0, dtype=float))
+    return tuple((float(q), float(h)) for q, h in zip(flows, heads) if q > 0 and h > 0)
+
+def make_operating_point_trace(operating_points, flow_unit, head_unit):
+    import plotly.graph_objects as go
+    # Convert user operating points to display units
+    display_flows = [convert_flow_from_lpm(q, flow_unit) for q, _ in operating_points]
+    display_heads = [convert_head_from_m(h, head_unit) for _, h in operating_points]
+    return go.Scatter(
+        x=display_flows, y=display_heads, mode='markers',
+        name=get_text("Operating Point"),
+        marker=dict(size=15, color='red', symbol='star'),
+        hovertemplate=f'Flow: %{{x:.2f}} {flow_unit}<br>Head: %{{y:.2f}} {head_unit}<extra></extra>'
+    )
+
+def build_curve_traces(catalog, model_nos, flow_unit, head_unit):
+    if len(model_nos) == 1:
+        points = catalog.curves.points(model_nos[0])
+        if points is None:
+            return None
+        if not len(points[0]):
+            return []
+        return [make_curve_trace(*points, f'{model_nos[0]} - Head Curve', 'blue', 8, flow_unit, head_unit)]
+    traces = []
     for i, model_no in enumerate(model_nos):
-        pump_data = curve_data[curve_data['Model No.'] == model_no]
-        if pump_data.empty:
-            continue
-        pump_row = pump_data.iloc[0]
-        head_columns = [col for col in curve_data.columns if col.endswith('M') and col not in ['Max Head(M)']]
-        flows, heads = [], []
-        for col in head_columns:
-            try:
-                head_value = float(col.replace('M', ''))
-                flow_value = pd.to_numeric(pump_row[col], errors='coerce')
-                if not pd.isna(flow_value) and flow_value > 0:
-                    # Convert from LPM and M to user's units
-                    flows.append(convert_flow_from_lpm(flow_value, flow_unit))
-                    heads.append(convert_head_from_m(head_value, head_unit))
-            except:
-                continue
-        if flows and heads:
-            sorted_data = sorted(zip(flows, heads))
-            flows, heads = zip(*sorted_data)
-            fig.add_trace(go.Scatter(
-                x=flows, y=heads, mode='lines+markers',
-                name=model_no,
-                line=dict(color=colors[i % len(colors)], width=3),
-                marker=dict(size=6),
-                hovertemplate=f'Flow: %{{x:.2f}} {flow_unit}<br>Head: %{{y:.2f}} {head_unit}<extra></extra>'
-            ))
-    if user_flow and user_head and user_flow > 0 and user_head > 0:
-        # Convert user operating point to display units
-        display_flow = convert_flow_from_lpm(user_flow, flow_unit)
-        display_head = convert_head_from_m(user_head, head_unit)
-        fig.add_trace(go.Scatter(
-            x=[display_flow], y=[display_head], mode='markers',
-            name=get_text("Operating Point"),
-            marker=dict(size=15, color='red', symbol='star'),
-            hovertemplate=f'Flow: {display_flow:.2f} {flow_unit}<br>Head: {display_head:.2f} {head_unit}<extra></extra>'
-        ))
-    fig.update_layout(
-        title=get_text("Multiple Curves"),
-        xaxis_title=get_text("Flow Rate", unit=flow_unit),
-        yaxis_title=get_text("Head", unit=head_unit),
-        hovermode='closest', showlegend=True, height=500, template='plotly_white'
+        points = catalog.curves.points(model_no)
+        if points is not None and len(points[0]):
+            traces.append(make_curve_trace(*points, model_no, CURVE_COLORS[i % len(CURVE_COLORS)], 6, flow_unit, head_unit))
+    return traces
+
+def get_curve_figure(catalog, model_nos, user_flow=None, user_head=None, flow_unit="L/min", head_unit="m"):
+    """Return the cached performance chart for one model or a comparison of several.
+
+    The curve traces are cached per (catalog version, models, units,
+    language) and the finished figure additionally per operating point, so
+    moving the duty point only builds a new operating-point trace.
+    ``user_flow`` and ``user_head`` may also be lists of several duty points.
+    """
+    model_nos = tuple(model_nos)
+    figure_cache = get_figure_cache()
+    base_key = (catalog.key, model_nos, flow_unit, head_unit, st.session_state.get("language", "English"))
+    traces = figure_cache.get_or_create(
+        ("traces",) + base_key, lambda: build_curve_traces(catalog, model_nos, flow_unit, head_unit)
     )
+    if traces is None:
+        return None
+    operating_points = get_operating_points(user_flow, user_head)
+
+    def build_figure():
+        import plotly.graph_objects as go
+        data = list(traces)
+        if operating_points:
+            data.append(make_operating_point_trace(operating_points, flow_unit, head_unit))
+        if len(model_nos) == 1:
+            title = get_text("Performance Curve", model=model_nos[0])
+        else:
+            title = get_text("Multiple Curves")
+        fig = go.Figure(data=data)
+        fig.update_layout(
+            title=title,
+            xaxis_title=get_text("Flow Rate", unit=flow_unit),
+            yaxis_title=get_text("Head", unit=head_unit),
+            hovermode='closest', showlegend=True, height=500, template='plotly_white'
+        )
+        return fig
+
+    return figure_cache.get_or_create(("figure",) + base_key + (operating_points,), build_figure)
+
+def create_coverage_chart(catalog, category=None, frequency=None, phase=None,
+                          user_flow=None, user_head=None, flow_unit="L/min", head_unit="m"):
+    """Heatmap of how many pumps in a category / frequency / phase combination cover each cell"""
+    import plotly.graph_objects as go
+    coverage = catalog.coverage
+    if coverage.empty:
+        return None
+    figure_cache = get_figure_cache()
+    base_key = (catalog.key, "coverage", category, frequency, phase, flow_unit, head_unit,
+                st.session_state.get("language", "English"))
+
+    def build_heatmap():
+        counts, models = coverage.cell_models(coverage.select(category, frequency, phase))
+        hover_text = [
+            [f"{get_text('Pump Count')}: {count}" + (f"<br>{', '.join(map(str, names))}" if names else "")
+             for count, names in zip(count_row, names_row)]
+            for count_row, names_row in zip(counts, models)
+        ]
+        return go.Heatmap(
+            x=convert_flow_from_lpm(coverage.flow_centers, flow_unit).astype(np.float32),
+            y=convert_head_from_m(coverage.head_centers, head_unit).astype(np.float32),
+            z=np.where(counts > 0, counts, np.nan).astype(np.float32),
+            text=hover_text, colorscale='Blues', colorbar=dict(title=get_text("Pump Count")),
+            hovertemplate=f'Flow: %{{x:.2f}} {flow_unit}<br>Head: %{{y:.2f}} {head_unit}<br>%{{text}}<extra></extra>'
+        )
+
+    heatmap = figure_cache.get_or_create(("heatmap",) + base_key, build_heatmap)
+    operating_points = get_operating_points(user_flow, user_head)
+
+    def build_figure():
+        data = [heatmap]
+        if operating_points:
+            data.append(make_operating_point_trace(operating_points, flow_unit, head_unit))
+        fig = go.Figure(data=data)
+        fig.update_layout(
+            title=get_text("Coverage Title"),
+            xaxis_title=get_text("Flow Rate", unit=flow_unit),
+            yaxis_title=get_text("Head", unit=head_unit),
+            xaxis_type='log', yaxis_type='log',
+            hovermode='closest', showlegend=False, height=550, template='plotly_white'
+        )
+        return fig
+
+    return figure_cache.get_or_create(("figure",) + base_key + (operating_points,), build_figure)
+
+def create_pump_curve_chart(catalog, model_no, user_flow=None, user_head=None, flow_unit="L/min", head_unit="m"):
+    return get_curve_figure(catalog, [model_no], user_flow, user_head, flow_unit, head_unit)
+
+def create_comparison_chart(catalog, model_nos, user_flow=None, user_head=None, flow_unit="L/min", head_unit="m"):
+    return get_curve_figure(catalog, model_nos, user_flow, user_head, flow_unit, head_unit)
+
+def search_duty_points(catalog, candidates, duty_points, min_speed=None):
+    """Rank pumps by how many duty points their curves reach.
+
+    Every (pump x duty point) pair is checked in one array operation against
+    the curve matrix. Pumps reaching all points come first, then those
+    reaching the most; ties go to the curve passing closest to the points.
+    Pumps without curve data or reaching no point are dropped.
+
+    Pumps scaled to another frequency are checked on their curve at that
+    speed ratio, r * Q(H / r**2). With a min_speed, variable-speed pumps
+    may also slow down, and the speed needed for the points they reach is
+    reported as in match_variable_speed.
+    """
+    curve_matrix = catalog.curve_matrix
+    rows = candidates["Model No."].map(curve_matrix.rows) if "Model No." in candidates.columns else pd.Series(dtype=float)
+    has_curve = rows.notna().to_numpy()
+    candidates = candidates[has_curve]
+    rows = rows[has_curve].to_numpy(dtype=int)
+    ratio = candidates["Speed Ratio"].to_numpy(dtype=float) if "Speed Ratio" in candidates.columns else np.ones(len(candidates))
+    flows = np.array([flow for flow, _ in duty_points], dtype=np.float32)
+    heads = np.array([head for _, head in duty_points], dtype=np.float32)
+    delivered = ratio[:, None] * curve_matrix.flow_at(heads / ratio[:, None] ** 2, rows)
+    met = delivered >= flows
+    met_count = met.sum(axis=1)
+    closeness = np.abs(delivered / flows - 1).mean(axis=1)
+    keep = met_count > 0
+    order = np.lexsort((closeness[keep], -met_count[keep]))
+    result = candidates[keep].iloc[order].copy()
+    result["Duty Points Met"] = [f"{n}/{len(duty_points)}" for n in met_count[keep][order]]
+    if min_speed is not None:
+        variable = candidates["Category"].isin(VARIABLE_SPEED_CATEGORIES).to_numpy() if "Category" in candidates.columns else np.zeros(len(candidates), dtype=bool)
+        speed = np.where(ratio != 1, ratio, np.nan)
+        if variable.any():
+            # Running faster only adds flow, so the points met at full speed are the
+            # ones met at all; the pump needs the speed of the most demanding of them
+            needed = np.column_stack([
+                curve_matrix.required_speed(flow, head, rows[variable], ratio[variable] * min_speed, ratio[variable])
+                for flow, head in duty_points
+            ])
+            speed[variable] = np.fmax.reduce(np.where(met[variable], needed, np.nan), axis=1)
+        speed = speed[keep][order]
+        nominal_frequency = get_nominal_frequency(result)
+        result["Required Speed (%)"] = np.round(speed * 100, 1)
+        result["Required Frequency (Hz)"] = np.round(speed * nominal_frequency, 1)
+    return result
+
+def build_report(catalog, table, chart_models, user_flow, user_head, flow_unit, head_unit, export_format):
+    """Snapshot everything a report needs, with all text already translated.
+
+    Reports are rendered on worker threads, which cannot read the session,
+    so nothing in the snapshot may depend on it.
+    """
+    curves = {}
+    for model_no in chart_models:
+        points = catalog.curves.points(model_no)
+        if points is not None and len(points[0]):
+            curves[model_no] = (convert_flow_from_lpm(points[0], flow_unit), convert_head_from_m(points[1], head_unit))
+    operating_points = [(convert_flow_from_lpm(q, flow_unit), convert_head_from_m(h, head_unit))
+                        for q, h in get_operating_points(user_flow, user_head)]
+    return {
+        "format": export_format,
+        "table": table,
+        "curves": curves,
+        "points": operating_points,
+        "title": get_text("Report Title"),
+        "chart_title": get_text("Multiple Curves"),
+        "flow_label": get_text("Flow Rate", unit=flow_unit),
+        "head_label": get_text("Head", unit=head_unit),
+        "point_label": get_text("Operating Point"),
+    }
+
+def draw_report_chart(report):
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(11.69, 8.27))
+    ax = fig.add_subplot()
+    for i, (model_no, (flows, heads)) in enumerate(report["curves"].items()):
+        ax.plot(flows, heads, marker='o', markersize=4, linewidth=2,
+                color=CURVE_COLORS[i % len(CURVE_COLORS)], label=model_no)
+    if report["points"]:
+        ax.scatter([q for q, _ in report["points"]], [h for _, h in report["points"]],
+                   marker='*', s=250, color='red', zorder=3, label=report["point_label"])
+    ax.set_title(f"{report['title']} - {report['chart_title']}")
+    ax.set_xlabel(report["flow_label"])
+    ax.set_ylabel(report["head_label"])
+    ax.grid(True, alpha=0.3)
+    if report["curves"] or report["points"]:
+        ax.legend()
     return fig
 
+def render_report_png(report):
+    buffer = io.BytesIO()
+    draw_report_chart(report).savefig(buffer, format="png", dpi=150)
+    return buffer.getvalue()
+
+def render_report_pdf(report):
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+    table = report["table"].drop(columns=["Product Link"], errors="ignore").fillna("")
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        if report["curves"]:
+            pdf.savefig(draw_report_chart(report))
+        for start in range(0, max(len(table), 1), EXPORT_TABLE_ROWS):
+            page = Figure(figsize=(11.69, 8.27))
+            ax = page.add_subplot()
+            ax.axis('off')
+            ax.set_title(report["title"])
+            rows = table.iloc[start:start + EXPORT_TABLE_ROWS]
+            if not rows.empty:
+                cells = ax.table(cellText=rows.astype(str).values, colLabels=list(rows.columns), loc='upper center')
+                cells.auto_set_font_size(False)
+                cells.set_fontsize(7)
+            pdf.savefig(page)
+    return buffer.getvalue()
+
+def render_report_xlsx(report):
+    curve_rows = [
+        {"Model No.": model_no, report["flow_label"]: flow, report["head_label"]: head}
+        for model_no, (flows, heads) in report["curves"].items()
+        for flow, head in zip(flows, heads)
+    ]
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        report["table"].to_excel(writer, sheet_name="Matching Pumps", index=False)
+        pd.DataFrame(curve_rows).to_excel(writer, sheet_name="Curves", index=False)
+        pd.DataFrame(report["points"], columns=[report["flow_label"], report["head_label"]]) \
+            .to_excel(writer, sheet_name="Operating Points", index=False)
+    return buffer.getvalue()
+
+REPORT_RENDERERS = {"PDF": render_report_pdf, "PNG": render_report_png, "XLSX": render_report_xlsx}
+
+class ReportExporter:
+    """Renders report exports on a small worker pool, off the script thread.
+
+    Jobs wait in the pool's queue; identical requests share one job, and
+    finished reports stay in an LRU cache keyed by the query, so exporting
+    a popular selection again is served straight from memory.
+    """
+    def __init__(self, workers=EXPORT_WORKERS, cache_size=EXPORT_CACHE_SIZE):
+        self.artifacts = LRUCache(cache_size)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-export")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, report):
+        with self._lock:
+            if key in self._jobs and not self._jobs[key].done():
+                return
+            if self.artifacts.get(key) is not None:
+                return
+            self._jobs[key] = self._pool.submit(self._render, key, report)
+
+    def _render(self, key, report):
+        artifact = REPORT_RENDERERS[report["format"]](report)
+        self.artifacts.put(key, artifact)
+        return artifact
+
+    def running(self, key):
+        """Whether a job for the key is still rendering; unlike status(), never takes a finished job"""
+        with self._lock:
+            job = self._jobs.get(key)
+            return job is not None and not job.done()
+
+    def status(self, key):
+        """Return ("done", bytes), ("running", None), ("failed", error) or (None, None).
+
+        A finished job is handed out once and then dropped: a failure is
+        reported to this caller only, and a rendered report stays in
+        ``artifacts``, where _render put it before the job finished.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.done():
+                del self._jobs[key]
+        if job is None:
+            artifact = self.artifacts.get(key)
+            return ("done", artifact) if artifact is not None else (None, None)
+        if not job.done():
+            return "running", None
+        if job.exception() is not None:
+            return "failed", job.exception()
+        return "done", job.result()
+
+@st.cache_resource
+def get_report_exporter():
+    return ReportExporter()
+
+@st.fragment(run_every=1)
+def wait_for_report(exporter, key):
+    """Poll a running export and rerun the page once it has finished.
+
+    The page's own status() call takes the finished job, so a failure
+    reaches the page instead of being used up by this poll.
+    """
+    if not exporter.running(key):
+        st.rerun()
+    st.info(get_text("Generating Report"))
+
+def scale_to_frequency(pumps, frequency):
+    """Keep pumps rated at a frequency and derive the others with the affinity laws.
+
+    A model listed only at another frequency is added with its rated flow
+    scaled by the speed ratio and its rated head by the ratio squared. The
+    ratio is kept in "Speed Ratio" and the stored frequency in "Scaled From (Hz)".
+    """
+    native = pumps[pumps["Frequency (Hz)"] == frequency].copy()
+    native["Speed Ratio"] = 1.0
+    others = pumps[pumps["Frequency (Hz)"].notna() & (pumps["Frequency (Hz)"] != frequency)]
+    if "Model No." in pumps.columns:
+        others = others[~others["Model No."].isin(native["Model No."])].drop_duplicates("Model No.")
+    scaled = others.copy()
+    ratio = frequency / scaled["Frequency (Hz)"]
+    scaled["Speed Ratio"] = ratio
+    scaled["Scaled From (Hz)"] = scaled["Frequency (Hz)"]
+    scaled["Frequency (Hz)"] = frequency
+    scaled["Q Rated/LPM"] = pd.to_numeric(scaled["Q Rated/LPM"], errors="coerce").fillna(0) * ratio
+    scaled["Head Rated/M"] = pd.to_numeric(scaled["Head Rated/M"], errors="coerce").fillna(0) * ratio ** 2
+    return pd.concat([native, scaled])
+
+def get_nominal_frequency(pumps):
+    """Frequency each pump's curve was measured at, before any scaling"""
+    nominal_frequency = pumps.get("Scaled From (Hz)", pd.Series(np.nan, index=pumps.index))
+    return nominal_frequency.fillna(pumps["Frequency (Hz)"]).to_numpy(dtype=float)
+
+def match_variable_speed(catalog, candidates, flow_lpm, head_m, min_speed):
+    """Filter pumps on a duty point allowing speed changes (affinity laws).
+
+    Variable-speed pumps may run anywhere from min_speed up to full speed,
+    and pumps scaled to another frequency run at that fixed speed ratio.
+    Both are checked on their curves, all solved in one batch, and get the
+    speed they need reported; every other pump keeps the rated-point check.
+    """
+    ratio = candidates["Speed Ratio"].to_numpy(dtype=float) if "Speed Ratio" in candidates.columns else np.ones(len(candidates))
+    variable = candidates["Category"].isin(VARIABLE_SPEED_CATEGORIES).to_numpy() if "Category" in candidates.columns else np.zeros(len(candidates), dtype=bool)
+    scaled = variable | (ratio != 1)
+    if "Model No." in candidates.columns:
+        rows = candidates["Model No."].map(catalog.curve_matrix.rows).to_numpy(dtype=float)
+    else:
+        rows = np.full(len(candidates), np.nan)
+    on_curve = scaled & ~np.isnan(rows)
+    required = np.full(len(candidates), np.nan)
+    if on_curve.any():
+        max_ratio = ratio[on_curve]
+        min_ratio = np.where(variable[on_curve], max_ratio * min_speed, max_ratio)
+        required[on_curve] = catalog.curve_matrix.required_speed(
+            flow_lpm, head_m, rows[on_curve].astype(int), min_ratio, max_ratio
+        )
+    rated_ok = ((candidates["Q Rated/LPM"] >= flow_lpm) & (candidates["Head Rated/M"] >= head_m)).to_numpy()
+    match = np.where(on_curve, ~np.isnan(required), rated_ok)
+    speed = np.where(variable & on_curve, required, np.where(scaled, ratio, np.nan))
+    nominal_frequency = get_nominal_frequency(candidates)
+    result = candidates[match].copy()
+    result["Required Speed (%)"] = np.round(speed[match] * 100, 1)
+    result["Required Frequency (Hz)"] = np.round(speed[match] * nominal_frequency[match], 1)
+    return result
+
+def describe_misses(miss, pump, flow_unit, head_unit):
+    """Readable list of the criteria a suggested pump does not meet"""
+    misses = []
+    if miss["Flow Short (LPM)"] > 0:
+        misses.append(get_text("Flow Short", amount=round(convert_flow_from_lpm(miss["Flow Short (LPM)"], flow_unit), 2), unit=flow_unit))
+    if miss["Head Short (M)"] > 0:
+        misses.append(get_text("Head Short", amount=round(convert_head_from_m(miss["Head Short (M)"], head_unit), 2), unit=head_unit))
+    if miss["Solids Short (mm)"] > 0:
+        misses.append(get_text("Solids Short", amount=round(miss["Solids Short (mm)"], 1)))
+    if miss["Other Category"]:
+        misses.append(get_text("Other Category", value=get_text(pump.get("Category", ""))))
+    if miss["Other Frequency"]:
+        misses.append(get_text("Other Frequency", value=pump.get("Frequency (Hz)")))
+    if miss["Other Phase"]:
+        misses.append(get_text("Other Phase", value=pump.get("Phase")))
+    return ", ".join(misses)
+
+def find_alternatives(catalog, flow_lpm, head_m, particle_size, category, frequency, phase, flow_unit, head_unit):
+    """Closest pumps to a search that found nothing, ready for display"""
+    misses = catalog.alternatives.nearest(flow_lpm, head_m, particle_size, category, frequency, phase)
+    if misses.empty:
+        return misses
+    alternatives = catalog.pumps.iloc[misses.index].copy()
+    columns = [col for col in ["Model", "Model No.", "Category", "Frequency (Hz)", "Phase", "Pass Solid Dia(mm)"]
+               if col in alternatives.columns]
+    alternatives = alternatives[columns]
+    rated = catalog.alternatives.values[misses.index]
+    alternatives.insert(min(2, len(columns)), f"Q Rated ({flow_unit})", np.round(convert_flow_from_lpm(rated[:, 0], flow_unit), 2))
+    alternatives.insert(min(3, len(columns) + 1), f"Head Rated ({head_unit})", np.round(convert_head_from_m(rated[:, 1], head_unit), 2))
+    alternatives[get_text("Missed Criteria")] = [
+        describe_misses(miss, pump, flow_unit, head_unit)
+        for (_, miss), (_, pump) in zip(misses.iterrows(), catalog.pumps.iloc[misses.index].iterrows())
+    ]
+    return alternatives.reset_index(drop=True)
+
 # --- Initialize Session State ---
 if 'initialized' not in st.session_state:
     st.session_state.initialized = True
@@ -495,6 +1759,7 @@ if 'initialized' not in st.session_state:
     st.session_state.selected_curve_models = []
     st.session_state.selected_columns = []
     st.session_state.filtered_pumps = None
+    st.session_state.search_alternatives = None
     st.session_state.user_flow = 0
     st.session_state.user_head = 0
     st.session_state.category_selection = None
@@ -505,11 +1770,6 @@ if 'initialized' not in st.session_state:
 
 # --- App Config & Header ---
 st.set_page_config(page_title="Pump Selector", layout="wide")
-try:
-    supabase = init_connection()
-except Exception as e:
-    st.error(get_text("Failed Connection", error=str(e)))
-    st.stop()
 
 col_logo, col_title, col_lang = st.columns([1, 5, 3])
 with col_logo:
@@ -528,24 +1788,41 @@ with col_lang:
 st.title(get_text("Pump Selection Tool"))
 
 # --- Data Loading ---
-pumps, curve_data = load_pump_data(), load_pump_curve_data()
+# Distributor catalogs are picked with ?tenant=<name>, see load_source_config
+try:
+    catalog_registry = get_catalog_registry()
+    tenant = st.query_params.get("tenant", catalog_registry.default_tenant)
+    if tenant not in catalog_registry:
+        # The name comes from the URL, so it is shown as code and cannot add Markdown or links
+        shown_tenant = "".join(char for char in tenant if char.isprintable() and char != "`")[:64]
+        st.error(get_text("Unknown Catalog", tenant=f"`{shown_tenant}`"))
+        st.stop()
+    catalog_store = catalog_registry.get(tenant)
+except Exception as e:
+    st.error(get_text("Failed Connection", error=str(e)))
+    st.stop()
+
+catalog = catalog_store.get()
+for error_key, message in catalog_store.refresh_error or catalog.errors:
+    st.error(get_text(error_key, error=message))
+pumps = catalog.pumps
 if pumps.empty:
     st.error(get_text("No Data"))
     st.stop()
 
 col_data1, col_data2 = st.columns(2)
 with col_data1:
-    st.caption(get_text("Data loaded", n_records=len(pumps), timestamp=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')))
+    st.caption(get_text("Data loaded", n_records=len(pumps), timestamp=catalog.loaded_at.strftime('%Y-%m-%d %H:%M:%S')))
 with col_data2:
-    if not curve_data.empty:
-        st.caption(get_text("Curve Data Loaded", count=len(curve_data)))
+    if catalog.curves_loaded and len(catalog.curves):
+        st.caption(get_text("Curve Data Loaded", count=len(catalog.curves)))
 
 # --- Refresh & Reset Buttons ---
 col1, col2, col_space = st.columns([1, 1.2, 5.8])
 with col1:
     if st.button(get_text("Refresh Data"), help="Refresh data from database", type="secondary", use_container_width=True):
-        st.cache_data.clear()
-        st.rerun()
+        catalog_store.refresh(force=True)
+        st.toast(get_text("Refreshing Data"))
 with col2:
     if st.button(get_text("Reset Inputs"), key="reset_button", help="Reset all fields to default", type="secondary", use_container_width=True):
         # Reset all input values
@@ -559,6 +1836,7 @@ with col2:
             st.session_state[key] = val
         st.session_state.selected_curve_models = []
         st.session_state.filtered_pumps = None
+        st.session_state.search_alternatives = None
         st.session_state.selected_columns = []
         st.session_state.category_selection = None
         st.session_state.frequency_selection = None
@@ -568,7 +1846,6 @@ with col2:
 # --- Step 1: Basic Search Inputs ---
 st.markdown(get_text("Step 1"))
 if "Category" in pumps.columns:
-    pumps["Category"] = pumps["Category"].astype(str).str.strip().replace(["nan", "None", "NaN"], "")
     unique_categories = [c for c in pumps["Category"].unique() if c and c.strip() and c.lower() not in ["nan", "none"]]
     translated_categories, original_to_translated, translated_to_original = [], {}, {}
     all_categories_translated = get_text("All Categories")
@@ -593,7 +1870,6 @@ category = translated_to_original.get(category_translated, category_translated)
 st.session_state.category_selection = category_translated
 
 if "Frequency (Hz)" in pumps.columns:
-    pumps["Frequency (Hz)"] = pd.to_numeric(pumps["Frequency (Hz)"], errors='coerce')
     freq_options = sorted(pumps["Frequency (Hz)"].dropna().unique())
     all_freq_options = [get_text("Show All Frequency")] + freq_options
     freq_index = 0
@@ -606,7 +1882,6 @@ else:
     st.session_state.frequency_selection = frequency
 
 if "Phase" in pumps.columns:
-    pumps["Phase"] = pd.to_numeric(pumps["Phase"], errors='coerce')
     phase_options = [p for p in sorted(pumps["Phase"].dropna().unique()) if p in [1, 3]]
     all_phase_options = [get_text("Show All Phase")] + phase_options
     phase_index = 0
@@ -721,6 +1996,33 @@ with st.expander(get_text("Column Selection"), expanded=False):
 # --- Result percentage slider ---
 result_percent = st.slider(get_text("Show Percentage"), min_value=5, max_value=100, value=100, step=1)
 
+# --- Multiple Duty Points ---
+duty_points = []
+if st.toggle(get_text("Multi Duty"), key="multi_duty_mode"):
+    st.caption(get_text("Duty Points Caption"))
+    duty_flow_col = get_text("Duty Flow", unit=flow_unit_original)
+    duty_head_col = get_text("Duty Head", unit=head_unit_original)
+    duty_table = st.data_editor(
+        pd.DataFrame({duty_flow_col: [float(flow_value)], duty_head_col: [float(head_value)]}),
+        num_rows="dynamic", hide_index=True,
+        column_config={
+            duty_flow_col: st.column_config.NumberColumn(duty_flow_col, min_value=0.0, format="%.2f"),
+            duty_head_col: st.column_config.NumberColumn(duty_head_col, min_value=0.0, format="%.2f"),
+        },
+        key=f"duty_points_editor_{flow_unit_original}_{head_unit_original}"
+    )
+    for point_flow, point_head in duty_table[[duty_flow_col, duty_head_col]].itertuples(index=False):
+        if pd.notna(point_flow) and pd.notna(point_head) and point_flow > 0 and point_head > 0:
+            duty_points.append((convert_flow_to_lpm(point_flow, flow_unit_original),
+                                convert_head_to_m(point_head, head_unit_original)))
+
+# --- Variable Speed ---
+variable_speed = st.toggle(get_text("Variable Speed"), key="variable_speed_mode")
+min_speed = 1.0
+if variable_speed:
+    st.caption(get_text("Variable Speed Caption"))
+    min_speed = st.slider(get_text("Min Speed"), min_value=30, max_value=100, value=50, step=5, key="min_speed") / 100
+
 # --- Search FORM ---
 with st.form("search_form"):
     submit_search = st.form_submit_button(get_text("Search"))
@@ -731,7 +2033,10 @@ with st.form("search_form"):
         if frequency != get_text("Show All Frequency"):
             try:
                 freq_value = float(frequency)
-                filtered_pumps = filtered_pumps[filtered_pumps["Frequency (Hz)"] == freq_value]
+                if variable_speed:
+                    filtered_pumps = scale_to_frequency(filtered_pumps, freq_value)
+                else:
+                    filtered_pumps = filtered_pumps[filtered_pumps["Frequency (Hz)"] == freq_value]
             except ValueError:
                 filtered_pumps = filtered_pumps[filtered_pumps["Frequency (Hz)"] == frequency]
         if phase != get_text("Show All Phase"):
@@ -749,10 +2054,18 @@ with st.form("search_form"):
         
         filtered_pumps["Q Rated/LPM"] = pd.to_numeric(filtered_pumps["Q Rated/LPM"], errors="coerce").fillna(0)
         filtered_pumps["Head Rated/M"] = pd.to_numeric(filtered_pumps["Head Rated/M"], errors="coerce").fillna(0)
-        if flow_lpm > 0:
-            filtered_pumps = filtered_pumps[filtered_pumps["Q Rated/LPM"] >= flow_lpm]
-        if head_m > 0:
-            filtered_pumps = filtered_pumps[filtered_pumps["Head Rated/M"] >= head_m]
+        if duty_points:
+            # Several duty points are matched against the curves rather than the rated point
+            filtered_pumps = search_duty_points(catalog, filtered_pumps, duty_points, min_speed if variable_speed else None)
+            flow_lpm = [flow for flow, _ in duty_points]
+            head_m = [head for _, head in duty_points]
+        elif variable_speed and flow_lpm > 0 and head_m > 0:
+            filtered_pumps = match_variable_speed(catalog, filtered_pumps, flow_lpm, head_m, min_speed)
+        else:
+            if flow_lpm > 0:
+                filtered_pumps = filtered_pumps[filtered_pumps["Q Rated/LPM"] >= flow_lpm]
+            if head_m > 0:
+                filtered_pumps = filtered_pumps[filtered_pumps["Head Rated/M"] >= head_m]
         if particle_size > 0 and "Pass Solid Dia(mm)" in filtered_pumps.columns:
             filtered_pumps["Pass Solid Dia(mm)"] = pd.to_numeric(filtered_pumps["Pass Solid Dia(mm)"], errors="coerce").fillna(0)
             filtered_pumps = filtered_pumps[filtered_pumps["Pass Solid Dia(mm)"] >= particle_size]
@@ -768,6 +2081,15 @@ with st.form("search_form"):
         max_to_show = max(1, int(len(filtered_pumps) * (result_percent / 100)))
         filtered_pumps = filtered_pumps.head(max_to_show).reset_index(drop=True)
         st.session_state.filtered_pumps = filtered_pumps
+        st.session_state.search_alternatives = None
+        if filtered_pumps.empty:
+            st.session_state.search_alternatives = find_alternatives(
+                catalog, max(np.atleast_1d(flow_lpm)), max(np.atleast_1d(head_m)), particle_size,
+                None if category == get_text("All Categories") else category,
+                None if frequency == get_text("Show All Frequency") else frequency,
+                None if phase == get_text("Show All Phase") else phase,
+                flow_unit_original, head_unit_original
+            )
         st.session_state.user_flow = flow_lpm
         st.session_state.user_head = head_m
         st.session_state.selected_curve_models = []
@@ -808,6 +2130,11 @@ if st.session_state.filtered_pumps is not None and not st.session_state.filtered
     if f"Head Rated ({head_unit_display})" in filtered_pumps.columns:
         display_df.insert(insert_pos, f"Head Rated ({head_unit_display})", 
                          filtered_pumps[f"Head Rated ({head_unit_display})"])
+        insert_pos += 1
+    for extra_column in ["Duty Points Met", "Required Speed (%)", "Required Frequency (Hz)"]:
+        if extra_column in filtered_pumps.columns:
+            display_df.insert(insert_pos, extra_column, filtered_pumps[extra_column])
+            insert_pos += 1
     
     # selection column
     model_column = "Model" if "Model" in display_df.columns else "Model No."
@@ -834,6 +2161,9 @@ if st.session_state.filtered_pumps is not None and not st.session_state.filtered
         help=f"Rated head in {head_unit_display}",
         format="%.2f"
     )
+    column_config["Duty Points Met"] = st.column_config.TextColumn(get_text("Points Met"))
+    column_config["Required Speed (%)"] = st.column_config.NumberColumn(get_text("Required Speed"), format="%.1f")
+    column_config["Required Frequency (Hz)"] = st.column_config.NumberColumn(get_text("Required Frequency"), format="%.1f")
     
     edited_df = st.data_editor(
         display_df,
@@ -841,7 +2171,7 @@ if st.session_state.filtered_pumps is not None and not st.session_state.filtered
         hide_index=True,
         use_container_width=True,
         num_rows="fixed",
-        disabled=[col for col in columns_to_show if col != "Select"],
+        disabled=[col for col in display_df.columns if col != "Select"],
         key="pump_table_editor"
     )
     
@@ -849,12 +2179,18 @@ if st.session_state.filtered_pumps is not None and not st.session_state.filtered
     selected_rows = edited_df[edited_df["Select"] == True]
     st.session_state.selected_curve_models = selected_rows[model_column].tolist()
     st.write("You selected:", st.session_state.selected_curve_models)
+elif st.session_state.filtered_pumps is not None:
+    st.warning(get_text("No Matches"))
+    alternatives = st.session_state.get("search_alternatives")
+    if alternatives is not None and not alternatives.empty:
+        st.markdown(get_text("Nearest Alternatives"))
+        st.caption(get_text("Alternatives Caption"))
+        st.dataframe(alternatives, hide_index=True, use_container_width=True)
 else:
     st.info("Run a search to see results.")
 
 # --- Pump Curve Visualization Section ---
-if (curve_data is not None and
-    st.session_state.filtered_pumps is not None and
+if (st.session_state.filtered_pumps is not None and
     not st.session_state.filtered_pumps.empty):
     selected_models = st.session_state.selected_curve_models
     if selected_models:
@@ -866,13 +2202,13 @@ if (curve_data is not None and
         flow_unit_display = st.session_state.flow_unit
         head_unit_display = st.session_state.head_unit
         
-        available_curve_models = [model for model in selected_models if model in curve_data["Model No."].values]
+        available_curve_models = [model for model in selected_models if model in catalog.curves]
         if available_curve_models:
             if len(available_curve_models) == 1:
                 st.subheader(f"Performance Curve - {available_curve_models[0]}")
                 with st.spinner(get_text("Loading Curve")):
                     fig = create_pump_curve_chart(
-                        curve_data, available_curve_models[0], user_flow, user_head,
+                        catalog, available_curve_models[0], user_flow, user_head,
                         flow_unit_display, head_unit_display
                     )
                     if fig:
@@ -884,16 +2220,18 @@ if (curve_data is not None and
                 st.caption(f"Comparing: {', '.join(available_curve_models)}")
                 with st.spinner(get_text("Loading Comparison")):
                     fig_comp = create_comparison_chart(
-                        curve_data, available_curve_models, user_flow, user_head,
+                        catalog, available_curve_models, user_flow, user_head,
                         flow_unit_display, head_unit_display
                     )
                     if fig_comp:
                         st.plotly_chart(fig_comp, use_container_width=True, key="multi_curve_comparison")
-                with st.expander("View Individual Pump Curves", expanded=False):
+                # A toggle rather than an expander, so the individual charts
+                # are only built once someone actually asks for them
+                if st.toggle(get_text("View Individual Curves"), key="show_individual_curves"):
                     for idx, model in enumerate(available_curve_models):
                         st.subheader(f"Performance Curve - {model}")
                         fig = create_pump_curve_chart(
-                            curve_data, model, user_flow, user_head,
+                            catalog, model, user_flow, user_head,
                             flow_unit_display, head_unit_display
                         )
                         if fig:
@@ -904,3 +2242,83 @@ if (curve_data is not None and
             st.warning("The selected pumps do not have curve data available.")
     else:
         st.info("Please select pumps from the results table to view performance curves.")
+
+# --- Report Export Section ---
+if st.session_state.filtered_pumps is not None and not st.session_state.filtered_pumps.empty:
+    st.markdown(get_text("Export Report"))
+    st.caption(get_text("Export Caption", count=EXPORT_CHART_MODELS))
+    export_table = edited_df.drop(columns=["Select"])
+    chart_selection = tuple(st.session_state.selected_curve_models) or ("first", EXPORT_CHART_MODELS)
+    col_format, col_generate, col_download = st.columns([1, 1.2, 3])
+    with col_format:
+        export_format = st.selectbox(get_text("Export Format"), list(EXPORT_FORMATS), key="export_format",
+                                     label_visibility="collapsed")
+    # Keyed on every cell, not just the model column, so a table showing other values never gets a stale report
+    export_key = (
+        catalog.key, export_format, table_digest(export_table), chart_selection, get_operating_points(st.session_state.user_flow, st.session_state.user_head),
+        st.session_state.flow_unit, st.session_state.head_unit, st.session_state.language
+    )
+    exporter = get_report_exporter()
+    with col_generate:
+        if st.button(get_text("Generate Report"), key="generate_report", use_container_width=True):
+            chart_models = st.session_state.selected_curve_models or [
+                model for model in st.session_state.filtered_pumps.get("Model No.", pd.Series(dtype=object))
+                if model in catalog.curves
+            ][:EXPORT_CHART_MODELS]
+            exporter.submit(export_key, build_report(
+                catalog, export_table, chart_models, st.session_state.user_flow, st.session_state.user_head,
+                st.session_state.flow_unit, st.session_state.head_unit, export_format
+            ))
+    status, result = exporter.status(export_key)
+    with col_download:
+        if status == "running":
+            wait_for_report(exporter, export_key)
+        elif status == "failed":
+            st.error(get_text("Failed Report", error=str(result)))
+        elif status == "done":
+            mime, extension = EXPORT_FORMATS[export_format]
+            st.download_button(
+                get_text("Download Report", format=export_format), result,
+                file_name=f"pump_selection.{extension}", mime=mime, key="download_report"
+            )
+
+# --- Coverage Map Section ---
+st.markdown(get_text("Coverage Map"))
+if st.toggle(get_text("Show Coverage Map"), key="show_coverage_map"):
+    coverage_category = None if category == get_text("All Categories") else category
+    coverage_frequency = None if frequency == get_text("Show All Frequency") else frequency
+    coverage_phase = None if phase == get_text("Show All Phase") else phase
+    duty_flow = convert_flow_to_lpm(flow_value, flow_unit_original)
+    duty_head = convert_head_to_m(head_value, head_unit_original)
+    fig_coverage = create_coverage_chart(
+        catalog, coverage_category, coverage_frequency, coverage_phase,
+        duty_flow, duty_head, flow_unit_original, head_unit_original
+    )
+    if fig_coverage:
+        st.caption(get_text("Coverage Caption"))
+        st.plotly_chart(fig_coverage, use_container_width=True, key="coverage_map")
+        if duty_flow > 0 and duty_head > 0:
+            st.markdown(f"**{get_text('Nearest Pumps')}**")
+            nearest = catalog.coverage.nearest(
+                duty_flow, duty_head, catalog.coverage.select(coverage_category, coverage_frequency, coverage_phase)
+            )
+            if nearest.empty:
+                st.info(get_text("No Coverage"))
+            else:
+                flow_at_head = get_text("Flow At Head", unit=flow_unit_original)
+                nearest[flow_at_head] = convert_flow_from_lpm(nearest["Flow (LPM)"], flow_unit_original).round(2)
+                nearest[get_text("Flow Margin")] = ((nearest["Flow (LPM)"] / duty_flow - 1) * 100).round(1)
+                st.dataframe(nearest.drop(columns=["Flow (LPM)"]), hide_index=True, use_container_width=True)
+    else:
+        st.info(get_text("No Coverage Data"))
+
+# --- Diagnostics ---
+# With SHOW_DIAGNOSTICS set, add ?diagnostics=1 to the URL to see how the shared caches are doing
+if SHOW_DIAGNOSTICS and st.query_params.get("diagnostics"):
+    with st.sidebar.expander("Diagnostics", expanded=True):
+        st.json({
+            "catalog": catalog_store.stats(),
+            "tenants": catalog_registry.stats(),
+            "figures": get_figure_cache().stats(),
+            "reports": get_report_exporter().artifacts.stats(),
+        })
@@ -0,0 +1,67 @@
+import ast
+import types
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+SELECTOR = Path(__file__).resolve().parents[1] / "selector.py"
+CURVE_HEADS = [5, 10, 15, 20, 25, 30, 35, 40, 50, 60, 70, 80]
+CATEGORIES = ["Dirty Water", "Clean Water", "Grinder", "Booster", "BLDC"]
+
+
+def is_definition(node):
+    """Imports, functions, classes and module constants, but none of the page itself"""
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+        return True
+    if isinstance(node, ast.Assign):
+        return all(isinstance(target, ast.Name) and (target.id.isupper() or target.id == "translations")
+                   for target in node.targets)
+    return False
+
+
+@pytest.fixture(scope="session")
+def selector():
+    """The definitions of selector.py.
+
+    selector.py is a Streamlit script, so importing it would render the
+    whole page; only its definitions are executed here.
+    """
+    tree = ast.parse(SELECTOR.read_text(encoding="utf-8"), filename=str(SELECTOR))
+    tree.body = [node for node in tree.body if is_definition(node)]
+    module = types.ModuleType("selector")
+    exec(compile(tree, str(SELECTOR), "exec"), module.__dict__)
+    return module
+
+
+def make_tables(n_pumps, seed=0):
+    """Synthetic pump and wide curve tables: quadratic curves that stop at shut-off head"""
+    rng = np.random.default_rng(seed)
+    models = [f"P{i:05d}" for i in range(n_pumps)]
+    rated_flow = rng.choice([60, 120, 250, 500, 1000, 2000], n_pumps) * rng.uniform(0.8, 1.25, n_pumps)
+    rated_head = rng.choice([6, 10, 16, 25, 40], n_pumps) * rng.uniform(0.8, 1.25, n_pumps)
+    pumps = pd.DataFrame({
+        "Model No.": models,
+        "Frequency (Hz)": rng.choice([50, 60], n_pumps),
+        "Phase": rng.choice([1, 3], n_pumps),
+        "Category": rng.choice(CATEGORIES, n_pumps),
+        "Q Rated/LPM": rated_flow.round(),
+        "Head Rated/M": rated_head.round(1),
+        "Pass Solid Dia(mm)": rng.choice([0, 6, 10, 35, 50], n_pumps),
+    })
+    max_flow, max_head = rated_flow * 1.6, rated_head * 1.5
+    curves = pd.DataFrame({"Model No.": models})
+    for head in CURVE_HEADS:
+        curves[f"{head}M"] = np.where(head < max_head, (max_flow * (1 - (head / max_head) ** 2)).round(1), np.nan)
+    return pumps, curves
+
+
+def make_catalog(selector, pumps, curves):
+    curve_store = selector.CurveStore.from_frame(curves)
+    return selector.Catalog(pumps, lambda: curve_store, 1, [], True)
+
+
+@pytest.fixture(scope="module")
+def catalog(selector):
+    return make_catalog(selector, *make_tables(3000))
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+
+def test_alternatives_prefer_matching_pumps_beyond_the_closest(selector):
+    rng = np.random.default_rng(1)
+    pumps = pd.DataFrame({
+        "Category": ["Booster"] * 500 + ["Grinder"] * 3,
+        "Frequency (Hz)": [50] * 503,
+        "Phase": [1] * 503,
+        "Q Rated/LPM": np.concatenate([rng.uniform(95, 105, 500), [400, 600, 800]]),
+        "Head Rated/M": np.concatenate([rng.uniform(9.5, 10.5, 500), [30, 40, 50]]),
+        "Pass Solid Dia(mm)": [0] * 503,
+    })
+    alternatives = selector.AlternativeIndex(pumps)
+    found = alternatives.nearest(flow=100, head=10, category="Grinder", limit=5)
+    assert found.index[:3].tolist() == [500, 501, 502]
+    assert not found["Other Category"].iloc[:3].any()
+    assert found["Other Category"].iloc[3:].all()
+    assert len(found) == 5
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from conftest import make_catalog
+
+
+def test_nearest_matches_brute_force(catalog):
+    coverage, curve_matrix = catalog.coverage, catalog.curve_matrix
+    rng = np.random.default_rng(0)
+    flows = np.exp(rng.uniform(np.log(20), np.log(4000), 300))
+    heads = np.exp(rng.uniform(np.log(1), np.log(70), 300))
+    for flow, head in zip(flows, heads):
+        delivered = curve_matrix.flow_at([head])[:, 0]
+        expected = set(curve_matrix.models[delivered >= flow])
+        found = coverage.nearest(flow, head, limit=len(curve_matrix.models))
+        assert set(found["Model No."]) == expected
+        if expected:
+            assert found["Flow (LPM)"].iloc[0] == delivered[delivered >= flow].min()
+
+
+def test_nearest_respects_mask(catalog):
+    coverage, curve_matrix = catalog.coverage, catalog.curve_matrix
+    mask = coverage.select(category="Booster")
+    delivered = curve_matrix.flow_at([12.0])[:, 0]
+    expected = set(curve_matrix.models[(delivered >= 150) & mask])
+    found = coverage.nearest(150, 12.0, mask=mask, limit=len(curve_matrix.models))
+    assert set(found["Model No."]) == expected
+
+
+def test_curve_gaps_do_not_ramp_to_zero(selector):
+    curve_data = pd.DataFrame({"Model No.": ["A"], "5M": [None], "10M": [None], "20M": [200.0], "30M": [None]})
+    curve_matrix = selector.CurveMatrix(selector.CurveStore.from_frame(curve_data))
+    flows = curve_matrix.flow_at([5, 12, 20, 25])[0]
+    assert flows.tolist() == [200, 200, 200, 0]
+
+
+def test_select_matches_every_row_of_a_model(selector):
+    pumps = pd.DataFrame({
+        "Model No.": ["A", "A", "B"],
+        "Category": ["Booster", "Booster", "Grinder"],
+        "Frequency (Hz)": [50, 60, 60],
+        "Phase": [1, 3, 1],
+    })
+    curves = pd.DataFrame({"Model No.": ["A", "B"], "10M": [100.0, 200.0], "20M": [50.0, 100.0]})
+    coverage = make_catalog(selector, pumps, curves).coverage
+    models = coverage.curve_matrix.models
+    assert set(models[coverage.select(frequency=60)]) == {"A", "B"}
+    assert set(models[coverage.select(category="Booster", frequency=60)]) == {"A"}
+    assert set(models[coverage.select(frequency=60, phase=1)]) == {"B"}
+    assert set(models[coverage.select(frequency=50, phase=3)]) == set()
@@ -0,0 +1,42 @@
+import numpy as np
+from conftest import make_tables
+
+
+def brute_force_speed(curve_matrix, flow, head, row, min_ratio, max_ratio, steps=2001):
+    ratios = np.linspace(min_ratio, max_ratio, steps, dtype=np.float32)
+    delivered = ratios * curve_matrix.flow_at(head / ratios ** 2, [row])[0]
+    reached = np.flatnonzero(delivered >= flow)
+    return ratios[reached[0]] if len(reached) else np.nan
+
+
+def test_required_speed_matches_brute_force(catalog):
+    curve_matrix = catalog.curve_matrix
+    rng = np.random.default_rng(2)
+    rows = rng.choice(len(curve_matrix.models), 300)
+    flows = np.exp(rng.uniform(np.log(20), np.log(3000), 300))
+    heads = np.exp(rng.uniform(np.log(2), np.log(50), 300))
+    min_ratio = rng.uniform(0.3, 0.6, 300)
+    max_ratio = rng.uniform(0.8, 1.2, 300)
+    step = (max_ratio - min_ratio) / 2000
+    reached = 0
+    for row, flow, head, low, high, tolerance in zip(rows, flows, heads, min_ratio, max_ratio, step):
+        speed = curve_matrix.required_speed(flow, head, [row], low, high)[0]
+        expected = brute_force_speed(curve_matrix, flow, head, row, low, high)
+        assert np.isnan(speed) == np.isnan(expected)
+        if not np.isnan(expected):
+            reached += 1
+            assert expected - tolerance - 1e-4 <= speed <= expected + 1e-4
+    assert reached > 50
+
+
+def test_long_and_wide_curves_build_the_same_store(selector):
+    _, wide = make_tables(500)
+    long = wide.melt(id_vars="Model No.", var_name="Head (M)", value_name="Flow (LPM)")
+    long["Head (M)"] = long["Head (M)"].str.rstrip("M").astype(float)
+    # Shuffle the points of every curve, keeping the models in order
+    long = long.sample(frac=1, random_state=0).sort_values("Model No.", kind="stable")
+    from_wide = selector.CurveStore.from_frame(wide)
+    from_long = selector.CurveStore.from_frame(long)
+    assert from_long.digest == from_wide.digest
+    np.testing.assert_array_equal(from_long.offsets, from_wide.offsets)
+    np.testing.assert_array_equal(selector.CurveMatrix(from_long).flows, selector.CurveMatrix(from_wide).flows)
@@ -0,0 +1,30 @@
+import time
+
+
+def wait(exporter, key):
+    deadline = time.monotonic() + 10
+    while exporter.running(key) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_failed_export_reaches_the_page_after_the_poll(selector, monkeypatch):
+    def fail(report):
+        raise ValueError("no fonts")
+    monkeypatch.setitem(selector.REPORT_RENDERERS, "broken", fail)
+    exporter = selector.ReportExporter(workers=1)
+    exporter.submit("key", {"format": "broken"})
+    wait(exporter, "key")
+    # The poll saw the job finish; the rerun it triggers must still see the error
+    assert not exporter.running("key")
+    status, error = exporter.status("key")
+    assert status == "failed" and str(error) == "no fonts"
+    assert exporter.status("key") == (None, None)
+
+
+def test_finished_export_is_served_from_the_artifacts(selector, monkeypatch):
+    monkeypatch.setitem(selector.REPORT_RENDERERS, "text", lambda report: b"report")
+    exporter = selector.ReportExporter(workers=1)
+    exporter.submit("key", {"format": "text"})
+    wait(exporter, "key")
+    assert exporter.status("key") == ("done", b"report")
+    assert exporter.status("key") == ("done", b"report")
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from conftest import make_catalog
+
+CURVES = pd.DataFrame({
+    "Model No.": ["A", "B", "C", "E"],
+    "10M": [300.0, 150.0, 1000.0, 260.0],
+    "20M": [200.0, 100.0, 800.0, 120.0],
+    "30M": [100.0, 50.0, 600.0, None],
+})
+
+
+def make_pumps(models, **columns):
+    return pd.DataFrame({
+        "Model No.": models,
+        "Category": columns.get("category", ["Booster"] * len(models)),
+        "Frequency (Hz)": columns.get("frequency", [50] * len(models)),
+        "Phase": [1] * len(models),
+        "Q Rated/LPM": columns.get("flow", [100] * len(models)),
+        "Head Rated/M": columns.get("head", [10] * len(models)),
+    })
+
+
+def test_search_duty_points_ranks_by_points_met_then_closeness(selector):
+    pumps = make_pumps(["A", "B", "C", "D", "E"])
+    catalog = make_catalog(selector, pumps, CURVES)
+    found = selector.search_duty_points(catalog, pumps, [(250, 10), (150, 20)])
+    # B reaches neither point and D has no curve
+    assert found["Model No."].tolist() == ["A", "C", "E"]
+    assert found["Duty Points Met"].tolist() == ["2/2", "2/2", "1/2"]
+    assert "Required Speed (%)" not in found.columns
+
+
+def test_scale_to_frequency_applies_affinity_laws(selector):
+    pumps = make_pumps(["A", "A", "F", "G"], frequency=[50, 60, 60, None], flow=[100, 120, 300, 50], head=[10, 14, 36, 5])
+    scaled = selector.scale_to_frequency(pumps, 50).set_index("Model No.")
+    assert sorted(scaled.index) == ["A", "F"]
+    assert scaled.loc["A", "Q Rated/LPM"] == 100
+    assert scaled.loc["A", "Speed Ratio"] == 1
+    assert scaled.loc["F", "Frequency (Hz)"] == 50
+    assert scaled.loc["F", "Scaled From (Hz)"] == 60
+    assert scaled.loc["F", "Speed Ratio"] == 50 / 60
+    assert scaled.loc["F", "Q Rated/LPM"] == 300 * 50 / 60
+    assert scaled.loc["F", "Head Rated/M"] == 36 * (50 / 60) ** 2
+    assert selector.get_nominal_frequency(scaled).tolist() == [50, 60]
+
+
+def test_match_variable_speed_solves_the_speed_on_the_curve(selector):
+    pumps = make_pumps(["A", "V", "B", "C"], category=["BLDC", "BLDC", "Booster", "Booster"],
+                       flow=[300, 260, 250, 100], head=[10, 10, 12, 10])
+    curves = CURVES.assign(**{"Model No.": ["A", "B", "C", "V"]})
+    catalog = make_catalog(selector, pumps, curves)
+    found = selector.match_variable_speed(catalog, pumps, 200, 10, 0.5).set_index("Model No.")
+    # B and C have fixed speeds and are checked on their rated points
+    assert sorted(found.index) == ["A", "B", "V"]
+    speed = catalog.curve_matrix.required_speed(200, 10, [catalog.curve_matrix.rows["A"]], 0.5, 1.0)[0]
+    assert speed < 1
+    assert found.loc["A", "Required Speed (%)"] == round(float(speed) * 100, 1)
+    assert found.loc["A", "Required Frequency (Hz)"] == round(float(speed) * 50, 1)
+    assert np.isnan(found.loc["B", "Required Speed (%)"])
+    # V's curve stops at 20 m
+    assert selector.match_variable_speed(catalog, pumps, 120, 25, 0.5)["Model No."].tolist() == ["A"]
+
+
+def test_search_duty_points_runs_scaled_pumps_at_their_speed_ratio(selector):
+    pumps = selector.scale_to_frequency(make_pumps(["A"], frequency=[60], flow=[300], head=[10]), 50)
+    catalog = make_catalog(selector, pumps, CURVES)
+    # At 50/60 of full speed A delivers about 213 LPM at 10 m instead of 300
+    assert selector.search_duty_points(catalog, pumps, [(220, 10)]).empty
+    found = selector.search_duty_points(catalog, pumps, [(200, 10), (220, 10)], min_speed=0.5)
+    assert found["Duty Points Met"].tolist() == ["1/2"]
+    assert found["Required Speed (%)"].tolist() == [83.3]
+    assert found["Required Frequency (Hz)"].tolist() == [50.0]
@@ -0,0 +1,31 @@
+import types
+
+ROWS = [{"updated_at": "2024-03-01T00:00:00+00:00"}, {"updated_at": None}, {"updated_at": "2024-05-01T00:00:00+00:00"}]
+
+
+class FakeQuery:
+    """Sorts like Postgres: NULLs first when descending, unless nullsfirst=False"""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, *columns, count=None):
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None):
+        nulls = [row for row in self.rows if row[column] is None]
+        values = sorted((row for row in self.rows if row[column] is not None), key=lambda row: row[column], reverse=desc)
+        self.rows = nulls + values if (desc if nullsfirst is None else nullsfirst) else values + nulls
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def execute(self):
+        return types.SimpleNamespace(data=self.rows, count=len(ROWS))
+
+
+def test_supabase_probe_skips_rows_without_an_update_time(selector):
+    source = selector.SupabaseSource("http://localhost", "key")
+    source._client = types.SimpleNamespace(table=lambda name: FakeQuery(ROWS))
+    assert source.version() == ((3, "2024-05-01T00:00:00+00:00"), (3, "2024-05-01T00:00:00+00:00"))